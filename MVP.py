@@ -1,30 +1,19 @@
 import speech_recognition as sr
-import pyttsx3
 import threading
 import queue
-import os
-import tempfile
 import time
-import whisper
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
-from langchain_chroma import Chroma
 from langchain.prompts import PromptTemplate
+from startup import StartupManager, add_agent_components, load_player
 
-db_path = r"chroma_db"
-
-embedding_model = OllamaEmbeddings(model="mxbai-embed-large")
-vectorstore = Chroma(persist_directory=db_path, embedding_function=embedding_model)
+startup = add_agent_components(StartupManager())
 
 def find_client(name_query: str):
     """Retrieves client data by exact name similarity."""
-    docs = vectorstore.similarity_search(name_query, k=1, filter={"Type": "Client"})
+    docs = startup.get("vectorstore").similarity_search(name_query, k=1, filter={"Type": "Client"})
     if not docs:
         return None
     return docs[0].metadata
 
-# --- LLM ---
-llm = OllamaLLM(model="llama3.2", temperature=0.1)
-
 full_prompt = PromptTemplate(
     template="""
     You are CANVI, a professional and empathetic sales representative from Canvas Digital. You are on a cold call with a client.
@@ -71,48 +60,36 @@ def llm_stage_reply(client_info, chat_history, new_offer_details):
         "new_offer_details": new_offer_details,
         "chat_history": chat_history,
     }
-    return llm.invoke(full_prompt.format(**inputs))
+    return startup.get("llm").invoke(full_prompt.format(**inputs))
 
 recognizer = sr.Recognizer()
 microphone = sr.Microphone()
-speaker = pyttsx3.init()
 speaker_queue = queue.Queue() 
-speaker.setProperty('rate', 200) 
-speaker.setProperty('voice', 'english_us') 
-speaker.setProperty('gender', 'female')
-
-# Test the speaker
-print("🔊 Testing speaker...")
-speaker.say("Speaker test successful")
-speaker.runAndWait()
-print("✅ Speaker is working!")
 
-# Initialize Whisper model (using base model for good balance of speed/accuracy)
-print("Loading Whisper model...")
-whisper_model = whisper.load_model("base")
-print("Whisper model loaded successfully!") 
+startup.add("player", load_player)
 
 def speak_response():
+    tts, player = startup.get("tts"), startup.get("player")
     while True:
         text = speaker_queue.get()
         if text is None: 
             break
         print(f"🔊 Speaking: {text}")
-        speaker.say(text)
-        speaker.runAndWait()
+        try:
+            player.play(*tts.synthesize(text)).wait()
+        except Exception as e:
+            print(f"Speech error: {e}")
         print("🔇 Finished speaking")
         speaker_queue.task_done()
 
-speaker_thread = threading.Thread(target=speak_response, daemon=True)
-speaker_thread.start()
+def pcm_from_audio(audio):
+    """speech_recognition AudioData -> float32 mono 16 kHz, the STT backends' input."""
+    import numpy as np
+    raw = audio.get_raw_data(convert_rate=16000, convert_width=2)
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
 
-# Give the speaker thread a moment to start
-import time
-time.sleep(0.5)
-print("✅ Speaker thread started and ready")
-
-def recognize_speech_whisper():
-    """Enhanced speech recognition using Whisper for better accuracy"""
+def recognize_speech():
+    """Speech recognition with the selected STT backend, Google as fallback"""
     try:
         with microphone as source:
             recognizer.adjust_for_ambient_noise(source, duration=1)
@@ -121,26 +98,10 @@ def recognize_speech_whisper():
             # Record audio
             audio = recognizer.listen(source, timeout=30, phrase_time_limit=30)
             
-            # Try Whisper first (more accurate)
+            # Try the selected STT backend first (more accurate)
             try:
-                # Save audio to temporary file for Whisper
-                tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-                tmp_file.write(audio.get_wav_data())
-                tmp_file.close()
-                
-                # Small delay to ensure file is fully written
-                time.sleep(0.1)
-                
-                # Use Whisper to transcribe
-                print("🧠 Processing speech with Whisper...")
-                result = whisper_model.transcribe(tmp_file.name)
-                client_reply = result["text"].strip()
-                
-                # Clean up temp file
-                try:
-                    os.unlink(tmp_file.name)
-                except:
-                    pass  # Ignore cleanup errors
+                print("🧠 Processing speech...")
+                client_reply = startup.get("stt").transcribe(pcm_from_audio(audio)).strip()
                 
                 if client_reply:
                     print(f"👤 Client: {client_reply}")
@@ -148,8 +109,8 @@ def recognize_speech_whisper():
                 else:
                     return ""
                         
-            except Exception as whisper_error:
-                print(f"Whisper failed, falling back to Google: {whisper_error}")
+            except Exception as stt_error:
+                print(f"STT failed, falling back to Google: {stt_error}")
                 # Fallback to Google speech recognition
                 client_reply = recognizer.recognize_google(audio)
                 if client_reply:
@@ -170,6 +131,9 @@ def cold_call_voice(client_meta, new_offer_details):
         speaker_queue.put("Client not found in records. Please try another name.")
         return
     
+    speaker_thread = threading.Thread(target=speak_response, daemon=True)
+    speaker_thread.start()
+
     no_response_count = 0 # Initialize counter for no responses
     max_no_response = 1   # Maximum allowed no responses before ending call (1 for 30 seconds timeout)
 
@@ -180,64 +144,76 @@ def cold_call_voice(client_meta, new_offer_details):
     }
 
     conversation_history = ""
+    call = startup.get("call_log").open_call(client_info, new_offer_details, source="voice")
+    outcome = "error"
     print(f"\n Calling {client_info['Name']}...")
     print("=" * 50)
 
-    # Initial greeting
-    initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
-    print(f"🔊 Adding initial greeting to speaker queue: {initial_greeting}")
-    speaker_queue.put(initial_greeting)
-    conversation_history += f"Canvi: {initial_greeting}\n"
+    try:
+        # Initial greeting
+        initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
+        print(f"🔊 Adding initial greeting to speaker queue: {initial_greeting}")
+        speaker_queue.put(initial_greeting)
+        conversation_history += f"Canvi: {initial_greeting}\n"
     
-    while True:
-        client_reply = recognize_speech_whisper()
-
-        if client_reply == "NO_RESPONSE":
-            no_response_count += 1
-            if no_response_count >= max_no_response:
-                response_message = "Sorry, are you there? I can't hear you. I'll end the call now. Goodbye!"
-                speaker_queue.put(response_message)
+        while True:
+            client_reply = recognize_speech()
+
+            if client_reply == "NO_RESPONSE":
+                no_response_count += 1
+                if no_response_count >= max_no_response:
+                    response_message = "Sorry, are you there? I can't hear you. I'll end the call now. Goodbye!"
+                    speaker_queue.put(response_message)
+                    outcome = "no_response"
+                    break
+                else:                
+                    speaker_queue.put("Sorry, are you there? Can you hear me?") 
+                    continue 
+            else:
+                no_response_count = 0
+
+            if client_reply.lower() == "bye":
+                speaker_queue.put("Thank you for your time. Goodbye!")
+                outcome = "client_goodbye"
                 break
-            else:                
-                speaker_queue.put("Sorry, are you there? Can you hear me?") 
-                continue 
-        else:
-            no_response_count = 0
 
-        if client_reply.lower() == "bye":
-            speaker_queue.put("Thank you for your time. Goodbye!")
-            break
-
-        conversation_history += f"Client: {client_reply}\n"
+            conversation_history += f"Client: {client_reply}\n"
         
-        try:
-            response = llm_stage_reply(client_info, conversation_history, new_offer_details)
-            response = response.strip()
+            try:
+                started = time.perf_counter()
+                response = llm_stage_reply(client_info, conversation_history, new_offer_details)
+                response = response.strip()
+                timings = {"reply": time.perf_counter() - started}
             
-            # Remove "Canvi:" prefix if it exists
-            if response.startswith("Canvi:"):
-                response = response[6:].strip()
+                # Remove "Canvi:" prefix if it exists
+                if response.startswith("Canvi:"):
+                    response = response[6:].strip()
             
-            if not response or response == "":
-                response = "I understand. Let me know if you have any questions about our services."
+                if not response or response == "":
+                    response = "I understand. Let me know if you have any questions about our services."
             
-            if "GOODBYE_CALL" in response:
-                speaker_queue.put("Thank you for your time. Goodbye!")
-                break
+                if "GOODBYE_CALL" in response:
+                    speaker_queue.put("Thank you for your time. Goodbye!")
+                    call.turn(client_reply, response, timings=timings)
+                    outcome = "agent_goodbye"
+                    break
             
-            # Speak the response
-            print(f"🤖 Canvi: {response}")
-            print(f"🔊 Adding to speaker queue: {response}")
-            speaker_queue.put(response)
-            conversation_history += f"Canvi: {response}\n"
+                # Speak the response
+                print(f"🤖 Canvi: {response}")
+                print(f"🔊 Adding to speaker queue: {response}")
+                speaker_queue.put(response)
+                conversation_history += f"Canvi: {response}\n"
+                call.turn(client_reply, response, timings=timings)
             
-        except Exception as e:
-            fallback_response = "I apologize, I'm having trouble processing that. Could you please repeat?"
-            speaker_queue.put(fallback_response)
-            conversation_history += f"Canvi: {fallback_response}\n"
-
-    speaker_queue.put(None) 
-    speaker_thread.join()
+            except Exception as e:
+                fallback_response = "I apologize, I'm having trouble processing that. Could you please repeat?"
+                speaker_queue.put(fallback_response)
+                conversation_history += f"Canvi: {fallback_response}\n"
+                call.turn(client_reply, fallback_response)
+    finally:
+        call.end(outcome)
+        speaker_queue.put(None)
+        speaker_thread.join()
 
 def cold_call_text(client_meta, new_offer_details):
     """Simulates a cold call conversation with a client."""
@@ -252,34 +228,51 @@ def cold_call_text(client_meta, new_offer_details):
     }
 
     conversation_history = ""
+    call = startup.get("call_log").open_call(client_info, new_offer_details, source="text")
+    outcome = "error"
     print(f"\n Chat with {client_info['Name']} started")
     print("=" * 50)
 
-    initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
-    print(f"Canvi: {initial_greeting}")
-    conversation_history += f"Canvi: {initial_greeting}\n"
+    try:
+        initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
+        print(f"Canvi: {initial_greeting}")
+        conversation_history += f"Canvi: {initial_greeting}\n"
     
-    while True:
-        client_reply = input("Client: ")
-        if client_reply.lower() == "bye":
-            print("Canvi: Thank you for your time. Goodbye!")
-            break
+        while True:
+            client_reply = input("Client: ")
+            if client_reply.lower() == "bye":
+                print("Canvi: Thank you for your time. Goodbye!")
+                outcome = "client_goodbye"
+                break
 
-        conversation_history += f"Client: {client_reply}\n"
+            conversation_history += f"Client: {client_reply}\n"
         
-        response = llm_stage_reply(client_info, conversation_history, new_offer_details).strip()
+            started = time.perf_counter()
+            try:
+                response = llm_stage_reply(client_info, conversation_history, new_offer_details).strip()
+            except Exception as e:
+                # e.g. the LLM missed the turn deadline; the chat goes on like the voice call does
+                print(f"Error: {e}")
+                response = "I apologize, I'm having trouble processing that. Could you please repeat?"
+            timings = {"reply": time.perf_counter() - started}
         
-        if "GOODBYE_CALL" in response:
-            print("Canvi: Thank you for your time. Goodbye!")
-            break
+            if "GOODBYE_CALL" in response:
+                print("Canvi: Thank you for your time. Goodbye!")
+                call.turn(client_reply, response, timings=timings)
+                outcome = "agent_goodbye"
+                break
         
-        print(f"Canvi: {response}")
-        conversation_history += f"Canvi: {response}\n"
+            print(f"Canvi: {response}")
+            conversation_history += f"Canvi: {response}\n"
+            call.turn(client_reply, response, timings=timings)
+    finally:
+        call.end(outcome)
 
 
 def main():
     print(" Canvas Digita Sales Agent")
     print("=" * 40)
+    startup.start()
     
     query = input("👤 Enter client name: ")
     client_meta = find_client(query)
@@ -295,6 +288,14 @@ def main():
     choice = input("Choose option (1 or 2): ").strip()
 
     new_offer_details = input(" Enter new opportunity details: ") 
+
+    needed = ("llm", "stt", "tts", "player") if choice == "1" else ("llm",)
+    for name in needed:
+        try:
+            startup.get(name)
+        except Exception as e:
+            print(f" Failed to load {name}: {e}")
+    startup.report()
     
     if choice == "1":
         try:
@@ -0,0 +1,116 @@
+"""In-memory TTS playback.
+
+Synthesized speech is decoded straight to float32 PCM in memory and played
+from one persistent sounddevice output stream. Each utterance gets a
+threading.Event that the stream callback sets once the audio has been
+handed to the device, so callers block on the event instead of polling.
+
+The TTS engine is swappable: gTTS (network, MP3 decoded with miniaudio) or
+kokoro-onnx (local, returns PCM directly; CANVI_KOKORO_MODEL/_VOICES point at
+its model files). CANVI_TTS picks the default.
+"""
+import os
+import threading
+from collections import deque
+from io import BytesIO
+
+import numpy as np
+
+PLAYBACK_RATE = 24000
+BLOCKSIZE = 512
+
+
+class GTTSEngine:
+    name = "gtts"
+
+    def synthesize(self, text):
+        """Returns (float32 mono PCM, sample_rate)."""
+        import miniaudio
+        from gtts import gTTS
+
+        mp3 = BytesIO()
+        gTTS(text=text, lang='en', slow=False).write_to_fp(mp3)
+        decoded = miniaudio.decode(mp3.getvalue(), output_format=miniaudio.SampleFormat.FLOAT32,
+                                   nchannels=1, sample_rate=PLAYBACK_RATE)
+        return np.asarray(decoded.samples, dtype=np.float32), decoded.sample_rate
+
+
+class KokoroEngine:
+    """kokoro-onnx; the model and voice files are downloaded separately."""
+    name = "kokoro"
+
+    def __init__(self, voice=None):
+        from kokoro_onnx import Kokoro
+
+        self.kokoro = Kokoro(os.environ.get("CANVI_KOKORO_MODEL", "kokoro-v1.0.onnx"),
+                             os.environ.get("CANVI_KOKORO_VOICES", "voices-v1.0.bin"))
+        self.voice = voice or os.environ.get("CANVI_KOKORO_VOICE", "af_sarah")
+
+    def synthesize(self, text):
+        samples, sample_rate = self.kokoro.create(text, voice=self.voice, speed=1.0, lang="en-us")
+        return np.asarray(samples, dtype=np.float32).reshape(-1), sample_rate
+
+
+ENGINES = {"gtts": GTTSEngine, "kokoro": KokoroEngine}
+
+
+def make_engine(name=None):
+    return ENGINES[name or os.environ.get("CANVI_TTS", "gtts")]()
+
+
+class PCMPlayer:
+    """Persistent output stream fed from a queue of PCM buffers."""
+
+    def __init__(self, sample_rate=PLAYBACK_RATE, blocksize=BLOCKSIZE):
+        import sounddevice as sd
+
+        self.sample_rate = sample_rate
+        self.pending = deque()
+        self.current = None
+        self.position = 0
+        self.finished = []
+        self.stream = sd.OutputStream(samplerate=sample_rate, channels=1, dtype="float32",
+                                      blocksize=blocksize, callback=self._callback)
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        # Buffers whose last samples went out in the previous block have now
+        # reached the device, so their waiters can go
+        for done in self.finished:
+            done.set()
+        self.finished = []
+
+        out = outdata[:, 0]
+        filled = 0
+        while filled < frames:
+            if self.current is None:
+                if not self.pending:
+                    break
+                self.current = self.pending.popleft()
+                self.position = 0
+            pcm, done = self.current
+            n = min(frames - filled, len(pcm) - self.position)
+            out[filled:filled + n] = pcm[self.position:self.position + n]
+            filled += n
+            self.position += n
+            if self.position >= len(pcm):
+                self.finished.append(done)
+                self.current = None
+        out[filled:] = 0.0
+
+    def play(self, pcm, sample_rate):
+        """Queues PCM for playback; returns an Event set when it has played."""
+        pcm = np.asarray(pcm, dtype=np.float32).reshape(-1)
+        if sample_rate != self.sample_rate:
+            positions = np.arange(0, len(pcm), sample_rate / self.sample_rate)
+            pcm = np.interp(positions, np.arange(len(pcm)), pcm).astype(np.float32)
+        done = threading.Event()
+        if len(pcm) == 0:
+            done.set()
+        else:
+            self.pending.append((pcm, done))
+        return done
+
+    def close(self):
+        self.stream.stop()
+        self.stream.close()
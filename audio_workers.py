@@ -0,0 +1,368 @@
+"""Multi-process audio pipeline for mvp22_stream.py.
+
+Capture/playback, STT and TTS each run in their own process so Whisper and
+kokoro inference can't hold the GIL while the sounddevice callbacks are due.
+PCM moves between processes through shared-memory ring buffers; only small
+control tuples travel over multiprocessing queues.
+"""
+import multiprocessing as mp
+import queue
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+from loguru import logger
+
+SAMPLE_RATE = 16000
+PLAYBACK_RATE = 24000
+CHANNELS = 1
+BLOCKSIZE = 1024
+SILENCE_THRESHOLD = 0.01
+SILENCE_DURATION = 1.5
+EVENT_POLL_SECONDS = 1.0  # how often a blocked caller checks the workers are still alive
+
+# Header layout (int64 slots): write counter, read counter, dropped samples
+_HEADER_SLOTS = 3
+_HEADER_BYTES = _HEADER_SLOTS * 8
+
+
+class PCMRing:
+    """Single-producer / single-consumer float32 ring buffer in shared memory.
+
+    The write and read counters only ever grow, so the producer and consumer
+    never write the same slot and no lock is needed. Samples that don't fit
+    are dropped and counted instead of blocking the producer.
+    """
+
+    def __init__(self, shm, capacity, owner):
+        self.shm = shm
+        self.capacity = capacity
+        self.owner = owner
+        self.header = np.ndarray((_HEADER_SLOTS,), dtype=np.int64, buffer=shm.buf)
+        self.data = np.ndarray((capacity,), dtype=np.float32, buffer=shm.buf, offset=_HEADER_BYTES)
+
+    @classmethod
+    def create(cls, capacity):
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_BYTES + capacity * 4)
+        ring = cls(shm, capacity, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name, capacity):
+        # Spawned workers share the parent's resource tracker, so attaching
+        # here doesn't schedule a second unlink
+        return cls(shared_memory.SharedMemory(name=name), capacity, owner=False)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def dropped(self):
+        return int(self.header[2])
+
+    def available(self):
+        return int(self.header[0] - self.header[1])
+
+    def write(self, samples):
+        """Copy samples into the ring; returns how many were written."""
+        samples = np.asarray(samples, dtype=np.float32).reshape(-1)
+        free = self.capacity - self.available()
+        n = min(len(samples), free)
+        if n < len(samples):
+            self.header[2] += len(samples) - n
+        if n == 0:
+            return 0
+        start = int(self.header[0] % self.capacity)
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:n]
+        self.header[0] += n
+        return n
+
+    def read(self, max_samples=None):
+        """Pop up to max_samples samples (all available if None)."""
+        n = self.available()
+        if max_samples is not None:
+            n = min(n, max_samples)
+        if n <= 0:
+            return np.zeros(0, dtype=np.float32)
+        start = int(self.header[1] % self.capacity)
+        first = min(n, self.capacity - start)
+        out = np.concatenate((self.data[start:start + first], self.data[:n - first]))
+        self.header[1] += n
+        return out
+
+    def clear(self):
+        self.header[1] = self.header[0]
+
+    def close(self):
+        # Drop the numpy views before closing, otherwise the mmap stays exported
+        del self.header, self.data
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class CallbackStats:
+    """Tracks audio callback inter-arrival jitter and overflow/underflow counts."""
+
+    def __init__(self, block_seconds):
+        self.expected = block_seconds
+        self.last = None
+        self.deltas = []
+        self.callbacks = 0
+        self.overflows = 0
+        self.underflows = 0
+
+    def record(self, status=None):
+        now = time.perf_counter()
+        if self.last is not None:
+            self.deltas.append(now - self.last)
+        self.last = now
+        self.callbacks += 1
+        if status:
+            if getattr(status, "input_overflow", False):
+                self.overflows += 1
+            if getattr(status, "output_underflow", False):
+                self.underflows += 1
+
+    def summary(self):
+        if self.deltas:
+            jitter = np.abs(np.array(self.deltas) - self.expected) * 1000
+            mean, p99, worst = float(jitter.mean()), float(np.percentile(jitter, 99)), float(jitter.max())
+        else:
+            mean = p99 = worst = 0.0
+        return {
+            "callbacks": self.callbacks,
+            "overflows": self.overflows,
+            "underflows": self.underflows,
+            "jitter_mean_ms": round(mean, 3),
+            "jitter_p99_ms": round(p99, 3),
+            "jitter_max_ms": round(worst, 3),
+        }
+
+
+# --- Worker processes ---
+
+def audio_io_worker(capture_name, capture_capacity, playback_name, playback_capacity, ctrl_q, events_q):
+    """Owns the sound card: mic -> capture ring, playback ring -> speaker."""
+    import sounddevice as sd
+
+    capture = PCMRing.attach(capture_name, capture_capacity)
+    playback = PCMRing.attach(playback_name, playback_capacity)
+    in_stats = CallbackStats(BLOCKSIZE / SAMPLE_RATE)
+    out_stats = CallbackStats(BLOCKSIZE / PLAYBACK_RATE)
+    pending_marks = []
+
+    def in_callback(indata, frames, time_info, status):
+        in_stats.record(status)
+        capture.write(indata[:, 0])
+
+    def out_callback(outdata, frames, time_info, status):
+        out_stats.record(status)
+        chunk = playback.read(frames)
+        outdata[:len(chunk), 0] = chunk
+        outdata[len(chunk):, 0] = 0.0
+
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, blocksize=BLOCKSIZE, callback=in_callback), \
+         sd.OutputStream(samplerate=PLAYBACK_RATE, channels=CHANNELS, blocksize=BLOCKSIZE, callback=out_callback):
+        while True:
+            try:
+                msg = ctrl_q.get(timeout=0.02)
+            except queue.Empty:
+                msg = None
+            if msg is not None:
+                if msg[0] == "stop":
+                    break
+                if msg[0] == "mark":
+                    # TTS finished writing an utterance; report once it has drained
+                    pending_marks.append(msg[1])
+            if pending_marks and playback.available() == 0:
+                events_q.put(("playback_done", pending_marks.pop(0)))
+
+    events_q.put(("io_stats", {"input": in_stats.summary(), "output": out_stats.summary(),
+                               "capture_dropped": capture.dropped}))
+    capture.close()
+    playback.close()
+
+
+def stt_worker(capture_name, capture_capacity, ctrl_q, events_q, stt_tiers=None):
+    """Segments captured PCM on silence and transcribes it with faster-whisper."""
+    from stt_tiers import DEFAULT_TIERS, STTTierManager
+
+    capture = PCMRing.attach(capture_name, capture_capacity)
+    stt = STTTierManager(stt_tiers or DEFAULT_TIERS)
+    events_q.put(("ready", "stt"))
+    max_silence_blocks = int(SILENCE_DURATION * SAMPLE_RATE / BLOCKSIZE)
+
+    while True:
+        msg = ctrl_q.get()
+        if msg[0] == "stop":
+            break
+        if msg[0] != "listen":
+            continue
+
+        # Anything captured while we were speaking is echo, not the client
+        capture.clear()
+        frames = []
+        silence_blocks = 0
+        heard_speech = False
+        while True:
+            if capture.available() < BLOCKSIZE:
+                time.sleep(0.01)
+                continue
+            block = capture.read(BLOCKSIZE)
+            frames.append(block)
+            if np.max(np.abs(block)) < SILENCE_THRESHOLD:
+                silence_blocks += 1
+                if silence_blocks > max_silence_blocks:
+                    break
+            else:
+                silence_blocks = 0
+                heard_speech = True
+
+        transcript = ""
+        if heard_speech:
+            transcript = stt.transcribe(np.concatenate(frames))["text"]
+        events_q.put(("transcript", transcript))
+
+    capture.close()
+
+
+def tts_worker(playback_name, playback_capacity, ctrl_q, io_ctrl_q, events_q):
+    """Synthesizes text with kokoro and streams the PCM into the playback ring."""
+    from audio_playback import KokoroEngine
+
+    playback = PCMRing.attach(playback_name, playback_capacity)
+    engine = KokoroEngine()
+    events_q.put(("ready", "tts"))
+
+    while True:
+        msg = ctrl_q.get()
+        if msg[0] == "stop":
+            break
+        if msg[0] != "speak":
+            continue
+        utterance_id, text = msg[1], msg[2]
+        audio, sample_rate = engine.synthesize(text)
+        if sample_rate != PLAYBACK_RATE:
+            positions = np.arange(0, len(audio), sample_rate / PLAYBACK_RATE)
+            audio = np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+        offset = 0
+        while offset < len(audio):
+            written = playback.write(audio[offset:offset + BLOCKSIZE * 8])
+            offset += written
+            if written == 0:
+                time.sleep(0.01)
+        io_ctrl_q.put(("mark", utterance_id))
+
+    playback.close()
+
+
+# --- Parent-side handle ---
+
+class AudioWorkers:
+    """Starts the three worker processes and exposes a blocking listen/speak API."""
+
+    def __init__(self, stt_tiers=None, capture_seconds=60, playback_seconds=60):
+        ctx = mp.get_context("spawn")
+        self.capture = PCMRing.create(SAMPLE_RATE * capture_seconds)
+        self.playback = PCMRing.create(PLAYBACK_RATE * playback_seconds)
+        self.io_ctrl = ctx.Queue()
+        self.stt_ctrl = ctx.Queue()
+        self.tts_ctrl = ctx.Queue()
+        self.events = ctx.Queue()
+        self._next_id = 0
+        self.io_stats = None
+        self.procs = [
+            ctx.Process(target=audio_io_worker, name="canvi-audio-io", daemon=True,
+                        args=(self.capture.name, self.capture.capacity, self.playback.name,
+                              self.playback.capacity, self.io_ctrl, self.events)),
+            ctx.Process(target=stt_worker, name="canvi-stt", daemon=True,
+                        args=(self.capture.name, self.capture.capacity, self.stt_ctrl,
+                              self.events, stt_tiers)),
+            ctx.Process(target=tts_worker, name="canvi-tts", daemon=True,
+                        args=(self.playback.name, self.playback.capacity, self.tts_ctrl,
+                              self.io_ctrl, self.events)),
+        ]
+
+    def start(self):
+        for proc in self.procs:
+            proc.start()
+        ready = set()
+        while ready != {"stt", "tts"}:
+            kind, payload = self._next_event()
+            if kind == "ready":
+                ready.add(payload)
+        logger.info("Audio workers ready (io, stt, tts)")
+        return self
+
+    def _next_event(self):
+        """Next worker event; raises if a worker has died instead of blocking forever."""
+        while True:
+            try:
+                return self.events.get(timeout=EVENT_POLL_SECONDS)
+            except queue.Empty:
+                dead = [p for p in self.procs if not p.is_alive()]
+                if dead:
+                    names = ", ".join(f"{p.name} (exit code {p.exitcode})" for p in dead)
+                    raise RuntimeError(f"Audio worker died: {names}")
+
+    def _wait_for(self, kind, match=None):
+        while True:
+            event, payload = self._next_event()
+            if event == kind and (match is None or payload == match):
+                return payload
+            if event == "io_stats":
+                self.io_stats = payload
+
+    def listen(self):
+        """Records one utterance and returns its transcript."""
+        self.stt_ctrl.put(("listen",))
+        return self._wait_for("transcript")
+
+    def speak(self, text):
+        """Plays text and blocks until the speaker has drained it."""
+        logger.info(f"🔊 Speaking: {text}")
+        self._next_id += 1
+        self.tts_ctrl.put(("speak", self._next_id, text))
+        self._wait_for("playback_done", self._next_id)
+
+    def stop(self):
+        self.stt_ctrl.put(("stop",))
+        self.tts_ctrl.put(("stop",))
+        self.io_ctrl.put(("stop",))
+        try:
+            self.io_stats = self._wait_for_stats(timeout=5)
+        except queue.Empty:
+            pass
+        for proc in self.procs:
+            proc.join(timeout=5)
+            if proc.is_alive():
+                proc.terminate()
+        self.capture.close()
+        self.playback.close()
+        if self.io_stats:
+            logger.info(f"Audio callback stats: {self.io_stats}")
+        return self.io_stats
+
+    def _wait_for_stats(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            event, payload = self.events.get(timeout=max(0.0, deadline - time.monotonic()))
+            if event == "io_stats":
+                return payload
+
+
+if __name__ == "__main__":
+    logger.remove(0)
+    logger.add(sys.stderr, level="INFO")
+    workers = AudioWorkers().start()
+    try:
+        workers.speak("Audio workers are running. Say something.")
+        print(f"Heard: {workers.listen()}")
+    finally:
+        print(workers.stop())
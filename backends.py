@@ -0,0 +1,525 @@
+"""STT / TTS / LLM / VAD backend registry with on-machine calibration.
+
+Every backend is registered under a kind and a name with a factory and the
+modules it needs. A backend exposes one call per kind:
+
+    stt.transcribe(audio)   float32 mono 16 kHz -> text
+    tts.synthesize(text)    -> (float32 mono PCM, sample_rate)
+    llm.invoke(prompt)      -> text (llm.gateway is the LLMGateway itself)
+    vad.is_speech(frame)    float32 mono 16 kHz -> bool
+
+BackendSelector calibrates every available backend once on this machine:
+latency and real-time factor (RTF = processing time / audio time), plus a
+quality score checked against a floor per kind. TTS renders a known
+sentence, which is the reference clip for STT (quality = 1 - WER); TTS
+quality is the best STT's WER on its audio; VAD is scored on that clip
+padded with low-level noise; LLM on a few exact-answer prompts. The
+fastest backend that meets the floor wins. Results are cached in
+backend_calibration.json against a machine fingerprint, so later startups
+skip calibration until the hardware or the installed backends change. A
+backend that failed is re-measured alone on the next startup, then daily.
+
+    python backends.py                 # show the cached (or fresh) selection
+    python backends.py --recalibrate
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import statistics
+import time
+
+import numpy as np
+from loguru import logger
+
+KINDS = ("stt", "tts", "llm", "vad")
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+CACHE_PATH = os.environ.get("CANVI_CALIBRATION", "backend_calibration.json")
+CALIBRATION_VERSION = 1
+REPEATS = 2
+FAILURE_RETRIES = 1                 # a failed backend is re-measured on this many later startups...
+FAILURE_RETRY_SECONDS = 24 * 3600   # ...and then again once a day
+CALIBRATION_TEXT = "Hello, this is Canvi from Canvas Digital. I am calling about your recent CRM integration."
+
+# Minimum quality score (0..1) a backend needs to be picked; CANVI_QUALITY_<KIND> overrides
+QUALITY_FLOOR = {"stt": 0.8, "tts": 0.8, "llm": 1.0, "vad": 0.9}
+
+# Which metric "fastest" means per kind
+SPEED_METRIC = {"stt": "rtf", "tts": "rtf", "llm": "latency", "vad": "latency"}
+
+LLM_CHECKS = [
+    ("Reply with exactly the word OK.", "ok"),
+    ("What is 2 + 3? Answer with just the number.", "5"),
+]
+
+REGISTRY = {kind: {} for kind in KINDS}
+
+
+def register(kind, name, factory, requires=()):
+    REGISTRY[kind][name] = (factory, tuple(requires))
+
+
+def is_available(kind, name):
+    factory, requires = REGISTRY[kind][name]
+    return all(importlib.util.find_spec(module) is not None for module in requires)
+
+
+# --- STT backends ---
+
+class TieredWhisperSTT:
+    """stt_tiers.STTTierManager (tiny.en escalating to base) behind the plain STT interface."""
+
+    def load(self):
+        from stt_tiers import STTTierManager
+        self.manager = STTTierManager()
+        return self
+
+    def transcribe(self, audio):
+        return self.manager.transcribe(audio)["text"]
+
+
+class OpenAIWhisperSTT:
+    def __init__(self, model="base"):
+        self.model_name = model
+
+    def load(self):
+        import whisper
+        self.model = whisper.load_model(self.model_name)
+        return self
+
+    def transcribe(self, audio):
+        return self.model.transcribe(np.asarray(audio, dtype=np.float32), fp16=False)["text"].strip()
+
+
+class GoogleSTT:
+    """speech_recognition's free Google endpoint (network)."""
+
+    def load(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+        return self
+
+    def transcribe(self, audio):
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+        try:
+            return self.recognizer.recognize_google(self.sr.AudioData(pcm, SAMPLE_RATE, 2))
+        except self.sr.UnknownValueError:
+            return ""
+
+
+# faster-whisper only as the tier manager: a single tiny.en model would always win on
+# RTF and bypass the per-utterance escalation to the larger tier
+register("stt", "faster-whisper:tiered", TieredWhisperSTT, ["faster_whisper"])
+register("stt", "whisper:base", lambda: OpenAIWhisperSTT("base"), ["whisper"])
+register("stt", "google", GoogleSTT, ["speech_recognition"])
+
+
+# --- TTS backends ---
+
+class EngineTTS:
+    """Wraps an audio_playback engine (gtts, kokoro)."""
+
+    def __init__(self, name):
+        self.engine_name = name
+
+    def load(self):
+        from audio_playback import make_engine
+        self.engine = make_engine(self.engine_name)
+        return self
+
+    def synthesize(self, text):
+        return self.engine.synthesize(text)
+
+
+class Pyttsx3TTS:
+    def load(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('rate', 200)
+        return self
+
+    def synthesize(self, text):
+        import tempfile
+        import wave
+
+        path = tempfile.NamedTemporaryFile(suffix=".wav", delete=False).name
+        try:
+            self.engine.save_to_file(text, path)
+            self.engine.runAndWait()
+            with wave.open(path, "rb") as f:
+                frames = f.readframes(f.getnframes())
+                sample_rate = f.getframerate()
+                channels = f.getnchannels()
+        finally:
+            os.unlink(path)
+        pcm = np.frombuffer(frames, dtype="<i2").reshape(-1, channels)[:, 0]
+        return pcm.astype(np.float32) / 32768.0, sample_rate
+
+
+register("tts", "kokoro", lambda: EngineTTS("kokoro"), ["kokoro_onnx"])
+register("tts", "gtts", lambda: EngineTTS("gtts"), ["gtts", "miniaudio"])
+register("tts", "pyttsx3", Pyttsx3TTS, ["pyttsx3"])
+
+
+# --- LLM backends ---
+
+class OllamaLLM:
+    def __init__(self, model):
+        self.model = model
+
+    def available(self):
+        """The model has to be pulled on the first Ollama endpoint."""
+        import httpx
+        endpoint = os.environ.get("OLLAMA_ENDPOINTS", "http://localhost:11434").split(",")[0].strip()
+        try:
+            tags = httpx.get(f"{endpoint}/api/tags", timeout=2.0).json()
+        except Exception:
+            return False
+        names = {m["name"] for m in tags.get("models", [])}
+        return self.model in names or f"{self.model}:latest" in names
+
+    def load(self):
+        from llm_gateway import WARMUP_DEADLINE, LLMGateway
+        self.gateway = LLMGateway(model=self.model, temperature=0.1)
+        # Loads the model into Ollama first, so a cold start isn't measured (or failed) as a turn
+        self.gateway.invoke("Reply with OK.", deadline=WARMUP_DEADLINE)
+        return self
+
+    def invoke(self, prompt):
+        return self.gateway.invoke(prompt)
+
+    def close(self):
+        self.gateway.close()
+
+
+# Only models known to handle the call prompts: the LLM checks are too easy to tell
+# a 1B model from a 3B one, and the faster model would always win
+for _model in os.environ.get("CANVI_LLM_MODELS", "llama3.2").split(","):
+    register("llm", f"ollama:{_model.strip()}", lambda model=_model.strip(): OllamaLLM(model), ["httpx"])
+
+
+# --- VAD backends ---
+
+class EnergyVAD:
+    """Peak amplitude threshold, as the recorders have always used.
+
+    Adjust CANVI_SILENCE_THRESHOLD to the microphone.
+    """
+
+    def __init__(self, threshold=float(os.environ.get("CANVI_SILENCE_THRESHOLD", "0.01"))):
+        self.threshold = threshold
+
+    def load(self):
+        return self
+
+    def is_speech(self, frame):
+        return bool(np.max(np.abs(frame), initial=0.0) >= self.threshold)
+
+
+class WebRTCVAD:
+    def __init__(self, aggressiveness=2):
+        self.aggressiveness = aggressiveness
+
+    def load(self):
+        import webrtcvad
+        self.vad = webrtcvad.Vad(self.aggressiveness)
+        return self
+
+    def is_speech(self, frame):
+        # webrtcvad only takes 10/20/30 ms frames; longer blocks are split
+        n = SAMPLE_RATE * FRAME_MS // 1000
+        pcm = (np.clip(frame, -1.0, 1.0) * 32767).astype("<i2")
+        return any(self.vad.is_speech(pcm[i:i + n].tobytes(), SAMPLE_RATE)
+                   for i in range(0, len(pcm) - n + 1, n))
+
+
+register("vad", "energy", EnergyVAD)
+register("vad", "webrtcvad", WebRTCVAD, ["webrtcvad"])
+
+
+# --- Calibration ---
+
+def word_error_rate(reference, hypothesis):
+    ref = re.findall(r"[a-z0-9']+", reference.lower())
+    hyp = re.findall(r"[a-z0-9']+", hypothesis.lower())
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h)))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def _timed(fn, *args, repeats=REPEATS):
+    """Runs once untimed (warmup), then returns (last result, median seconds)."""
+    result = fn(*args)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def _to_stt_rate(pcm, sample_rate):
+    from media_gateway import resample
+    return resample(pcm, sample_rate, SAMPLE_RATE)
+
+
+def _vad_fixture(clip):
+    """Clip padded with noise, plus per-frame labels (None = ambiguous, skipped)."""
+    rng = np.random.default_rng(0)
+    pad = (rng.standard_normal(SAMPLE_RATE) * 1e-3).astype(np.float32)
+    audio = np.concatenate([pad, clip, pad])
+    n = SAMPLE_RATE * FRAME_MS // 1000
+    frames = [audio[i:i + n] for i in range(0, len(audio) - n + 1, n)]
+    clip_rms = np.sqrt(np.mean(clip ** 2)) or 1.0
+    labels = []
+    for i, frame in enumerate(frames):
+        start = i * n
+        if start + n <= len(pad) or start >= len(pad) + len(clip):
+            labels.append(False)
+        elif np.sqrt(np.mean(frame ** 2)) > 0.5 * clip_rms:
+            labels.append(True)
+        else:
+            labels.append(None)
+    return frames, labels
+
+
+def _measure(kind, backend, fixture):
+    if kind == "tts":
+        (pcm, sample_rate), seconds = _timed(backend.synthesize, CALIBRATION_TEXT)
+        duration = len(pcm) / sample_rate
+        fixture.setdefault("tts_audio", {})[backend.name] = _to_stt_rate(pcm, sample_rate)
+        return {"latency": seconds, "rtf": seconds / max(duration, 1e-3), "quality": None}
+    if kind == "stt":
+        clip = fixture["clip"]
+        text, seconds = _timed(backend.transcribe, clip)
+        return {"latency": seconds, "rtf": seconds / (len(clip) / SAMPLE_RATE),
+                "quality": max(0.0, 1.0 - word_error_rate(CALIBRATION_TEXT, text))}
+    if kind == "llm":
+        passed, times = 0, []
+        for prompt, expected in LLM_CHECKS:
+            reply, seconds = _timed(backend.invoke, prompt, repeats=1)
+            passed += expected in reply.strip().lower()
+            times.append(seconds)
+        return {"latency": statistics.median(times), "rtf": None, "quality": passed / len(LLM_CHECKS)}
+    if kind == "vad":
+        frames, labels = fixture["vad"]
+        decisions, seconds = _timed(lambda: [backend.is_speech(f) for f in frames])
+        speech = [d for d, label in zip(decisions, labels) if label is True]
+        silence = [not d for d, label in zip(decisions, labels) if label is False]
+        quality = (np.mean(speech) + np.mean(silence)) / 2 if speech and silence else 0.0
+        return {"latency": seconds / len(frames), "rtf": None, "quality": float(quality)}
+    raise ValueError(kind)
+
+
+class BackendSelector:
+    def __init__(self, kinds=KINDS, cache_path=CACHE_PATH, floors=None, recalibrate=False):
+        self.kinds = tuple(kinds)
+        self.cache_path = cache_path
+        self.floors = dict(QUALITY_FLOOR, **(floors or {}))
+        for kind in KINDS:
+            override = os.environ.get(f"CANVI_QUALITY_{kind.upper()}")
+            if override:
+                self.floors[kind] = float(override)
+        self.recalibrate = recalibrate or os.environ.get("CANVI_RECALIBRATE") == "1"
+        self.results = {}
+        self.choice = {}
+        self.instances = {}
+
+    def candidates(self, kind):
+        names = []
+        for name, (factory, _) in REGISTRY[kind].items():
+            if not is_available(kind, name):
+                continue
+            # Backends with an external dependency (e.g. an Ollama model) check it themselves
+            probe = getattr(factory(), "available", None)
+            if probe is None or probe():
+                names.append(name)
+        return names
+
+    def fingerprint(self, candidates):
+        return {
+            "version": CALIBRATION_VERSION,
+            "host": platform.node(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpus": os.cpu_count(),
+            "python": platform.python_version(),
+            "candidates": candidates,
+        }
+
+    def select(self):
+        """Loads the cached calibration if it still matches, otherwise calibrates."""
+        candidates = {kind: self.candidates(kind) for kind in self.kinds}
+        fingerprint = self.fingerprint(candidates)
+        cached = self._read_cache()
+        if not self.recalibrate and cached and cached["fingerprint"] == fingerprint:
+            self.results = cached["results"]
+            logger.info(f"Backend calibration loaded from {self.cache_path}")
+            # Failures may be transient (model still loading, network down): only those are re-measured
+            retry = {kind: [name for name, m in self.results.get(kind, {}).items() if self._retry_due(m)]
+                     for kind in self.kinds}
+            if any(retry.values()):
+                logger.info(f"Re-measuring failed backends: {retry}")
+                for kind, measured in self.calibrate(retry, previous=self.results).items():
+                    self.results.setdefault(kind, {}).update(measured)
+                self._write_cache(fingerprint)
+        else:
+            logger.info("Calibrating backends on this machine...")
+            self.results = self.calibrate(candidates)
+            self._write_cache(fingerprint)
+
+        for kind in self.kinds:
+            self.choice[kind] = self._pick(kind)
+            override = os.environ.get(f"CANVI_{kind.upper()}")
+            if override:
+                self.choice[kind] = override
+        # Keep the winners warm, drop the rest
+        warm, self.instances = self.instances, {}
+        for (kind, name), backend in warm.items():
+            if self.choice.get(kind) == name:
+                self.instances[kind] = backend
+            elif hasattr(backend, "close"):
+                backend.close()
+        logger.info(f"Backends: {self.choice}")
+        return self
+
+    @staticmethod
+    def _retry_due(measured):
+        if "error" not in measured:
+            return False
+        return measured.get("attempts", 1) <= FAILURE_RETRIES or \
+            time.time() - measured.get("failed_at", 0) > FAILURE_RETRY_SECONDS
+
+    @staticmethod
+    def _failure(previous, kind, name, error):
+        attempts = previous.get(kind, {}).get(name, {}).get("attempts", 0) + 1
+        return {"error": error, "attempts": attempts, "failed_at": time.time()}
+
+    def calibrate(self, candidates, previous=None):
+        """Measures the candidate backends; `previous` results are the cache a partial re-measure extends."""
+        previous = previous or {}
+        results = {kind: {} for kind in self.kinds}
+        fixture = {}
+        # TTS first: its audio is the reference clip for STT and VAD
+        order = [k for k in ("tts", "stt", "vad", "llm") if k in self.kinds]
+        for kind in order:
+            if kind in ("stt", "vad") and candidates.get(kind) and "clip" not in fixture:
+                if not self._reference_clip(fixture, candidates):
+                    logger.warning(f"No TTS available to render a reference clip, skipping {kind} calibration")
+                    for name in candidates[kind]:
+                        results[kind][name] = self._failure(previous, kind, name, "no reference clip")
+                    continue
+            for name in candidates.get(kind, ()):
+                try:
+                    backend = REGISTRY[kind][name][0]().load()
+                    backend.name = name
+                    results[kind][name] = _measure(kind, backend, fixture)
+                    self.instances[(kind, name)] = backend
+                except Exception as e:
+                    logger.warning(f"Calibrating {kind} backend {name} failed: {e}")
+                    results[kind][name] = self._failure(previous, kind, name, str(e))
+                logger.info(f"  {kind} {name}: {results[kind][name]}")
+
+        # TTS intelligibility, judged by the most accurate STT
+        stt_results = dict(previous.get("stt", {}), **results.get("stt", {}))
+        judges = [(m["quality"], name) for name, m in stt_results.items() if m.get("quality") is not None]
+        if judges and fixture.get("tts_audio"):
+            judge_name = max(judges)[1]
+            if ("stt", judge_name) not in self.instances:
+                # Partial re-measure of TTS only: the judge comes from the cached results
+                self.instances[("stt", judge_name)] = REGISTRY["stt"][judge_name][0]().load()
+            judge = self.instances[("stt", judge_name)]
+            for name, audio in fixture.get("tts_audio", {}).items():
+                results["tts"][name]["quality"] = max(0.0, 1.0 - word_error_rate(CALIBRATION_TEXT, judge.transcribe(audio)))
+        return results
+
+    def _reference_clip(self, fixture, candidates):
+        audio = fixture.get("tts_audio")
+        if not audio:
+            # This run's TTS candidates first, then any other registered engine
+            names = list(candidates.get("tts") or [])
+            for name in names + [n for n in REGISTRY["tts"] if n not in names]:
+                if not is_available("tts", name):
+                    continue
+                try:
+                    pcm, sample_rate = REGISTRY["tts"][name][0]().load().synthesize(CALIBRATION_TEXT)
+                    audio = {name: _to_stt_rate(pcm, sample_rate)}
+                    break
+                except Exception as e:
+                    logger.warning(f"Reference clip from {name} failed: {e}")
+        if not audio:
+            return False
+        fixture["clip"] = next(iter(audio.values()))
+        fixture["vad"] = _vad_fixture(fixture["clip"])
+        return True
+
+    def _pick(self, kind):
+        measured = {n: m for n, m in self.results.get(kind, {}).items() if "error" not in m}
+        if not measured:
+            return None
+        metric = SPEED_METRIC[kind]
+        # Unscored (e.g. no STT to judge TTS) counts as meeting the floor
+        passing = [n for n, m in measured.items() if m["quality"] is None or m["quality"] >= self.floors[kind]]
+        if passing:
+            return min(passing, key=lambda n: measured[n][metric])
+        best = max(measured, key=lambda n: measured[n]["quality"])
+        logger.warning(f"No {kind} backend meets quality floor {self.floors[kind]}, using the best: {best}")
+        return best
+
+    def load(self, kind):
+        """The selected backend for `kind`, loaded (already warm if it was just calibrated)."""
+        if kind in self.instances:
+            return self.instances.pop(kind)
+        name = self.choice.get(kind)
+        if name is None:
+            raise RuntimeError(f"No usable {kind} backend on this machine")
+        backend = REGISTRY[kind][name][0]().load()
+        backend.name = name
+        return backend
+
+    def _read_cache(self):
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_cache(self, fingerprint):
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "results": self.results,
+                       "calibrated_at": time.strftime("%Y-%m-%d %H:%M:%S")}, f, indent=2)
+
+    def report(self):
+        print(f"{'kind':<5} {'backend':<24}{'latency':>10}{'rtf':>7}{'quality':>9}  picked")
+        for kind in self.kinds:
+            for name, m in self.results.get(kind, {}).items():
+                picked = "*" if self.choice.get(kind) == name else ""
+                if "error" in m:
+                    print(f"{kind:<5} {name:<24}{'failed':>10}  {m['error'][:40]}")
+                    continue
+                rtf = f"{m['rtf']:.2f}" if m["rtf"] is not None else "-"
+                quality = f"{m['quality']:.2f}" if m["quality"] is not None else "-"
+                print(f"{kind:<5} {name:<24}{m['latency'] * 1000:>8.1f}ms{rtf:>7}{quality:>9}  {picked}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recalibrate", action="store_true", help="ignore the cached calibration")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="comma-separated subset of stt,tts,llm,vad")
+    args = parser.parse_args()
+    selector = BackendSelector(kinds=args.kinds.split(","), recalibrate=args.recalibrate).select()
+    selector.report()
+
+
+if __name__ == "__main__":
+    main()
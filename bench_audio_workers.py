@@ -0,0 +1,113 @@
+"""Benchmark: audio callback jitter and overflows under CPU load.
+
+Compares the capture callback running in the same process as a GIL-heavy
+workload (what mvp22_stream.py does today) against the callback running in
+its own process the way audio_workers.audio_io_worker does.
+
+    python bench_audio_workers.py --seconds 10 --load-threads 2
+    python bench_audio_workers.py --synthetic   # no sound card needed
+"""
+import argparse
+import json
+import multiprocessing as mp
+import threading
+import time
+
+import numpy as np
+
+from audio_workers import BLOCKSIZE, CHANNELS, SAMPLE_RATE, CallbackStats, PCMRing
+
+
+def _burn(stop):
+    """Pure-Python busy loop that holds the GIL like token-by-token decoding."""
+    x = 0
+    while not stop.is_set():
+        for i in range(10000):
+            x = (x * 31 + i) % 1000003
+
+
+def _synthetic_stream(callback, stop):
+    """Calls callback at the block period, the way PortAudio's thread would."""
+    period = BLOCKSIZE / SAMPLE_RATE
+    block = np.zeros((BLOCKSIZE, CHANNELS), dtype=np.float32)
+    next_tick = time.perf_counter()
+    while not stop.is_set():
+        next_tick += period
+        delay = next_tick - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        callback(block, BLOCKSIZE, None, None)
+
+
+def run_capture(seconds, synthetic, ring_name=None, ring_capacity=0):
+    """Runs a capture stream for `seconds` and returns its callback stats."""
+    stats = CallbackStats(BLOCKSIZE / SAMPLE_RATE)
+    ring = PCMRing.attach(ring_name, ring_capacity) if ring_name else None
+
+    def callback(indata, frames, time_info, status):
+        stats.record(status)
+        if ring is not None:
+            ring.write(indata[:, 0])
+            ring.clear()
+
+    if synthetic:
+        stop = threading.Event()
+        ticker = threading.Thread(target=_synthetic_stream, args=(callback, stop), daemon=True)
+        ticker.start()
+        time.sleep(seconds)
+        stop.set()
+        ticker.join()
+    else:
+        import sounddevice as sd
+        with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, blocksize=BLOCKSIZE, callback=callback):
+            time.sleep(seconds)
+
+    if ring is not None:
+        ring.close()
+    return stats.summary()
+
+
+def _capture_process(seconds, synthetic, ring_name, ring_capacity, result_q):
+    result_q.put(run_capture(seconds, synthetic, ring_name, ring_capacity))
+
+
+def bench(mode, seconds, load_threads, synthetic):
+    stop = threading.Event()
+    burners = [threading.Thread(target=_burn, args=(stop,), daemon=True) for _ in range(load_threads)]
+    for t in burners:
+        t.start()
+    try:
+        if mode == "inproc":
+            return run_capture(seconds, synthetic)
+        ctx = mp.get_context("spawn")
+        ring = PCMRing.create(SAMPLE_RATE * 5)
+        result_q = ctx.Queue()
+        proc = ctx.Process(target=_capture_process,
+                           args=(seconds, synthetic, ring.name, ring.capacity, result_q))
+        proc.start()
+        result = result_q.get()
+        proc.join()
+        ring.close()
+        return result
+    finally:
+        stop.set()
+        for t in burners:
+            t.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--load-threads", type=int, default=2)
+    parser.add_argument("--synthetic", action="store_true", help="drive the callback from a timer thread")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in ("inproc", "workers"):
+        print(f"Running {mode} for {args.seconds}s with {args.load_threads} load thread(s)...")
+        results[mode] = bench(mode, args.seconds, args.load_threads, args.synthetic)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Benchmark: call log write path and query scan rate.
+
+Logs synthetic calls (start, N turns, end) into a scratch directory and
+reports how long log() blocks the caller, how long the background writer
+takes to drain, the compression ratio against plain JSON lines, and how
+fast call_log.scan() reads everything back, in full and filtered to one
+client through the index.
+
+    python bench_call_log.py --calls 20000 --turns 8
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from call_log import CallLog, scan
+from conversation_stages import STAGE_INSTRUCTIONS
+
+REPLIES = [
+    "Hi {name}! I see you got our {service} back in May - does that sound right?",
+    "Great, how has it been working for your team?",
+    "We also have a marketing automation add-on at 20% off for existing clients. Interested?",
+    "Happy to. Could we set up a short call next week to walk through it?",
+    "No problem at all, thank you for your time today.",
+]
+TRANSCRIPTS = ["Yes, speaking.", "Yeah, that's right.", "Pretty well, some sync issues though.",
+               "Maybe, send me some details.", "I'm busy right now.", "Who is this?"]
+OUTCOMES = ["goodbye_client", "goodbye_agent", "hung_up", "no_response"]
+STAGES = list(STAGE_INSTRUCTIONS)
+
+
+def directory_size(root):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(root) for f in files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=5000)
+    parser.add_argument("--turns", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    root = tempfile.mkdtemp(prefix="call_log_bench_")
+    try:
+        log = CallLog(root=root)
+        latencies = []
+        raw_bytes = 0
+        started = time.perf_counter()
+        for i in range(args.calls):
+            client = {"Name": f"Client {rng.randrange(args.clients):05d}",
+                      "LastService": "CRM Integration", "PurchaseDate": "2025-05-16"}
+            t0 = time.perf_counter()
+            call = log.open_call(client, offer="20% off marketing automation", source="bench")
+            latencies.append(time.perf_counter() - t0)
+            for _ in range(args.turns):
+                t0 = time.perf_counter()
+                call.turn(rng.choice(TRANSCRIPTS),
+                          rng.choice(REPLIES).format(name=client["Name"], service=client["LastService"]),
+                          stage=rng.choice(STAGES),
+                          timings={"listen": rng.uniform(1, 6), "reply": rng.uniform(0.3, 2), "speak": rng.uniform(1, 4)},
+                          cached=rng.random() < 0.2)
+                latencies.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            call.end(rng.choice(OUTCOMES), stage=rng.choice(STAGES))
+            latencies.append(time.perf_counter() - t0)
+        produced = time.perf_counter() - started
+        log.close()
+        drained = time.perf_counter() - started
+
+        events = args.calls * (args.turns + 2)
+        t0 = time.perf_counter()
+        for event in scan(root):
+            raw_bytes += len(json.dumps(event, ensure_ascii=False)) + 1
+        full_scan = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        matched = sum(1 for _ in scan(root, client="Client 00042"))
+        client_scan = time.perf_counter() - t0
+
+        latencies = np.asarray(latencies) * 1e6
+        disk = directory_size(root)
+        print(json.dumps({
+            "events": events,
+            "written": log.stats()["written"],
+            "dropped": log.stats()["dropped"],
+            "log_call_us": {"p50": round(float(np.percentile(latencies, 50)), 1),
+                            "p99": round(float(np.percentile(latencies, 99)), 1),
+                            "max": round(float(latencies.max()), 1)},
+            "produce_s": round(produced, 3),
+            "drain_s": round(drained, 3),
+            "raw_json_mb": round(raw_bytes / 1e6, 2),
+            "on_disk_mb": round(disk / 1e6, 2),
+            "compression_ratio": round(raw_bytes / disk, 1),
+            "full_scan_events_per_s": round(events / full_scan),
+            "client_scan": {"events": matched, "seconds": round(client_scan, 3)},
+        }, indent=2))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
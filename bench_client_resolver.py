@@ -0,0 +1,162 @@
+"""Benchmark: bulk dial-list resolution vs one name at a time.
+
+Builds a client index of synthetic names and resolves a dial list with
+duplicates, typos and unknown names two ways:
+
+- one-at-a-time: embed each name with its own request, then one vector
+  query per name (the find_client() path),
+- ClientResolver: de-duplicate, exact matches, batched concurrent
+  embedding, one vectorized search.
+
+By default embeddings come from a local character-trigram embedder with a
+simulated per-request round-trip (--rtt) and per-text cost (--per-item),
+so the benchmark runs without Ollama; --ollama uses mxbai-embed-large.
+Reports names/s, speedup and how each bucket compares with the names the
+list was generated from.
+
+    python bench_client_resolver.py --clients 5000 --names 3000
+    python bench_client_resolver.py --ollama --clients 500 --names 300
+"""
+import argparse
+import hashlib
+import json
+import random
+import time
+import zlib
+
+import numpy as np
+
+from client_resolver import DOCUMENT_TEMPLATE, MATCH_THRESHOLD, MISSING_THRESHOLD, ClientResolver
+from embedding_index import EmbeddingIndex
+
+FIRST = ["Sarah", "James", "Maria", "David", "Aisha", "Chen", "Olivia", "Liam", "Noah", "Emma", "Priya",
+         "Lucas", "Sofia", "Mateo", "Yuki", "Omar", "Hannah", "Ethan", "Zara", "Diego"]
+LAST = ["Johnson", "Smith", "Garcia", "Patel", "Nguyen", "Kim", "Brown", "Muller", "Rossi", "Silva",
+        "Khan", "Lopez", "Wilson", "Tanaka", "Okafor", "Novak", "Haddad", "Jensen", "Costa", "Reyes"]
+
+
+class TrigramEmbedder:
+    """Hashed character trigrams -> 1024 dims, with simulated request latency."""
+
+    def __init__(self, rtt, per_item, dim=1024):
+        self.rtt = rtt
+        self.per_item = per_item
+        self.dim = dim
+        self.requests = 0
+
+    def _vector(self, text):
+        text = f"  {text.lower()}  "
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for i in range(len(text) - 2):
+            vector[zlib.crc32(text[i:i + 3].encode()) % self.dim] += 1.0
+        return vector / np.linalg.norm(vector)
+
+    def embed_documents(self, texts):
+        self.requests += 1
+        time.sleep(self.rtt + self.per_item * len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def typo(name, rng):
+    i = rng.randrange(1, len(name) - 1)
+    op = rng.choice(["drop", "swap", "double"])
+    if op == "drop":
+        return name[:i] + name[i + 1:]
+    if op == "swap":
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i] + name[i:]
+
+
+def client_names(count, rng):
+    names = set()
+    while len(names) < count:
+        suffix = hashlib.sha1(str(rng.random()).encode()).hexdigest()[:4]
+        names.add(f"{rng.choice(FIRST)} {rng.choice(LAST)}-{suffix}")
+    return sorted(names)
+
+
+def dial_list(clients, count, rng):
+    """[(query, intended client or None)] with ~20% duplicates, 25% typos, 5% unknown names."""
+    entries = []
+    while len(entries) < count:
+        roll = rng.random()
+        if entries and roll < 0.20:
+            entries.append(rng.choice(entries))
+        elif roll < 0.25:
+            entries.append((f"Unknown Person-{rng.randrange(10**6)}", None))
+        else:
+            name = rng.choice(clients)
+            entries.append((typo(name, rng) if roll < 0.50 else name, name))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--names", type=int, default=2000)
+    parser.add_argument("--rtt", type=float, default=0.015, help="simulated seconds per embedding request")
+    parser.add_argument("--per-item", type=float, default=0.001, help="simulated seconds per embedded text")
+    parser.add_argument("--ollama", action="store_true", help="embed with mxbai-embed-large via Ollama")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    clients = client_names(args.clients, rng)
+    entries = dial_list(clients, args.names, rng)
+    queries = [q for q, _ in entries]
+
+    if args.ollama:
+        from langchain_ollama import OllamaEmbeddings
+        embedder = OllamaEmbeddings(model="mxbai-embed-large")
+        match, missing = MATCH_THRESHOLD, MISSING_THRESHOLD
+    else:
+        embedder = TrigramEmbedder(args.rtt, args.per_item)
+        # Trigram cosines run lower than mxbai's
+        match, missing = 0.75, 0.6
+
+    documents = [DOCUMENT_TEMPLATE.format(name) for name in clients]
+    vectors = np.concatenate([np.asarray(embedder.embed_documents(documents[i:i + 256]), dtype=np.float32)
+                              for i in range(0, len(documents), 256)])
+    index = EmbeddingIndex("int8").build([f"client-{i}" for i in range(len(clients))], vectors,
+                                         [{"Type": "Client", "Name": name} for name in clients], documents)
+
+    # One at a time, like find_client()
+    start = time.perf_counter()
+    serial = {}
+    for query in queries:
+        hits = index.search(embedder.embed_query(DOCUMENT_TEMPLATE.format(query)), k=1)
+        serial[query] = hits[0][2]["Name"] if hits else None
+    serial_seconds = time.perf_counter() - start
+
+    resolver = ClientResolver(index, embedder.embed_documents, match_threshold=match, missing_threshold=missing)
+    start = time.perf_counter()
+    result = resolver.resolve(queries)
+    bulk_seconds = time.perf_counter() - start
+
+    intended = dict(entries)
+    correct = sum(1 for q, c in result["matched"].items() if c["name"] == intended[q])
+    serial_correct = sum(1 for q, name in serial.items() if intended[q] is not None and name == intended[q])
+    unknown_flagged = sum(1 for q in result["missing"] if intended[q] is None) + \
+        sum(1 for q in result["ambiguous"] if intended[q] is None)
+
+    print(json.dumps({
+        "names": len(queries),
+        "unique": result["stats"]["unique"],
+        "one_at_a_time": {"seconds": round(serial_seconds, 3), "names_per_s": round(len(queries) / serial_seconds),
+                          "correct_top1": serial_correct},
+        "bulk": {"seconds": round(bulk_seconds, 3), "names_per_s": round(len(queries) / bulk_seconds),
+                 **{k: v for k, v in result["stats"].items() if k not in ("queries", "unique", "seconds")}},
+        "speedup": round(serial_seconds / bulk_seconds, 1),
+        "bulk_quality": {
+            "matched_correct": correct,
+            "matched_wrong": len(result["matched"]) - correct,
+            "unknown_names": sum(1 for q in set(queries) if intended[q] is None),
+            "unknown_flagged_missing_or_ambiguous": unknown_flagged,
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
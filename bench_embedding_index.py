@@ -0,0 +1,107 @@
+"""Benchmark: quantized / HNSW embedding index against the float32 baseline.
+
+Builds embedding_index.EmbeddingIndex in several configurations over the
+same vectors and reports resident memory, build time, per-query latency and
+recall@k against exact float32 cosine search.
+
+By default the vectors are synthetic 1024-dim clustered embeddings (the
+shape of mxbai-embed-large); --chroma points at a persisted Chroma store to
+use its real stored vectors instead. Queries are perturbed copies of
+indexed vectors, like a slightly misspelled client name.
+
+    python bench_embedding_index.py --n 100000 --queries 500
+    python bench_embedding_index.py --chroma chroma_db
+"""
+import argparse
+import importlib.util
+import json
+import tempfile
+import time
+
+import numpy as np
+
+from embedding_index import EmbeddingIndex, normalize
+
+CONFIGS = [
+    ("float32 flat (baseline)", dict(precision="float32", rerank=1)),
+    ("float16 flat + rerank", dict(precision="float16")),
+    ("int8 flat + rerank", dict(precision="int8")),
+    ("int8 flat, no rerank", dict(precision="int8", rerank=1)),
+    ("hnsw M=16 ef=64", dict(mode="hnsw", M=16, ef_search=64)),
+    ("hnsw M=32 ef=128", dict(mode="hnsw", M=32, ef_search=128)),
+]
+
+
+def synthetic(n, dim, clusters, rng):
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    assignment = rng.integers(0, clusters, n)
+    return centroids[assignment] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def chroma_vectors(path):
+    import chromadb
+    client = chromadb.PersistentClient(path=path)
+    vectors = []
+    for collection in client.list_collections():
+        name = collection if isinstance(collection, str) else collection.name
+        data = client.get_collection(name).get(include=["embeddings"])
+        if len(data["embeddings"]):
+            vectors.append(np.asarray(data["embeddings"], dtype=np.float32))
+    return np.concatenate(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=50000, help="synthetic vectors")
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chroma", help="use the stored vectors of this persisted Chroma directory")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = chroma_vectors(args.chroma) if args.chroma else synthetic(args.n, args.dim, args.clusters, rng)
+    picks = rng.integers(0, len(vectors), args.queries)
+    queries = vectors[picks] + 0.3 * rng.standard_normal((args.queries, vectors.shape[1])).astype(np.float32)
+    k = min(args.k, len(vectors))
+
+    # Ground truth: exact float32 cosine
+    exact = np.argsort(-(normalize(vectors) @ normalize(queries).T), axis=0)[:k].T
+    truth = [set(row) for row in exact]
+    ids = list(range(len(vectors)))
+
+    hnsw = importlib.util.find_spec("hnswlib") is not None
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, recall@{k}")
+    print(f"{'config':<26}{'memory MB':>10}{'build s':>9}{'p50 ms':>8}{'p99 ms':>8}{'batch ms/q':>11}{'recall':>8}")
+    rows = []
+    for name, options in CONFIGS:
+        if options.get("mode") == "hnsw" and not hnsw:
+            print(f"{name:<26}{'skipped (hnswlib not installed)':>30}")
+            continue
+        with tempfile.TemporaryDirectory() as directory:
+            index = EmbeddingIndex(**options).build(ids, vectors, directory=directory)
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                hits = index.search(query, k)
+                latencies.append(time.perf_counter() - start)
+                found.append({hit[0] for hit in hits})
+            start = time.perf_counter()
+            index.search_batch(queries, k)
+            batch = (time.perf_counter() - start) / len(queries)
+
+        recall = np.mean([len(f & t) / k for f, t in zip(found, truth)])
+        latencies = np.asarray(latencies) * 1000
+        row = {"config": name, "memory_mb": index.memory_bytes() / 1e6, "build_s": index.build_seconds,
+               "p50_ms": float(np.percentile(latencies, 50)), "p99_ms": float(np.percentile(latencies, 99)),
+               "batch_ms_per_query": batch * 1000, "recall": float(recall)}
+        rows.append(row)
+        print(f"{name:<26}{row['memory_mb']:>10.1f}{row['build_s']:>9.2f}{row['p50_ms']:>8.2f}"
+              f"{row['p99_ms']:>8.2f}{row['batch_ms_per_query']:>11.3f}{row['recall']:>8.3f}")
+
+    print(json.dumps(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Benchmark: LLM gateway routing and hedging against stub Ollama servers.
+
+Starts local HTTP servers that speak Ollama's /api/generate and inject
+latency (a normal delay plus occasional long stalls), then fires concurrent
+turns through LLMGateway with and without hedging and prints latency
+percentiles, timeouts and per-endpoint metrics.
+
+    python bench_llm_gateway.py --turns 200 --concurrency 8
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_gateway import LLMGateway
+
+
+def make_stub(delay, stall_prob, stall_seconds, seed):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class StubOllama(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                stalled = rng.random() < stall_prob
+            time.sleep(stall_seconds if stalled else delay)
+            payload = json.dumps({"model": body["model"], "response": "OK", "done": True,
+                                  "prompt_eval_count": len(body["prompt"].split())}).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the gateway cancelled this request (hedge lost or deadline hit)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(endpoints, turns, concurrency, hedge_after, deadline):
+    gateway = LLMGateway(endpoints=endpoints, hedge_after=hedge_after, deadline=deadline)
+    latencies, failures = [], 0
+
+    def turn(i):
+        start = time.perf_counter()
+        try:
+            gateway.invoke(f"turn {i}: the client said they are busy")
+            return time.perf_counter() - start
+        except Exception:
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for result in pool.map(turn, range(turns)):
+            if result is None:
+                failures += 1
+            else:
+                latencies.append(result)
+    metrics = gateway.metrics()
+    gateway.close()
+
+    latencies.sort()
+
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1) if latencies else None
+
+    return {"p50_ms": pct(0.5), "p95_ms": pct(0.95), "p99_ms": pct(0.99), "failed": failures, "gateway": metrics}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.05, help="normal stub latency (s)")
+    parser.add_argument("--stall-prob", type=float, default=0.05)
+    parser.add_argument("--stall-seconds", type=float, default=3.0)
+    parser.add_argument("--hedge-after", type=float, default=0.3)
+    parser.add_argument("--deadline", type=float, default=2.0)
+    args = parser.parse_args()
+
+    stubs = [make_stub(args.delay, args.stall_prob, args.stall_seconds, seed) for seed in (1, 2)]
+    endpoints = [f"http://127.0.0.1:{s.server_address[1]}" for s in stubs]
+
+    results = {
+        "single endpoint, no hedging": run(endpoints[:1], args.turns, args.concurrency, float("inf"), args.deadline),
+        "two endpoints, no hedging": run(endpoints, args.turns, args.concurrency, float("inf"), args.deadline),
+        "two endpoints, hedged": run(endpoints, args.turns, args.concurrency, args.hedge_after, args.deadline),
+    }
+    for server in stubs:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
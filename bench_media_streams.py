@@ -0,0 +1,131 @@
+"""Benchmark: many concurrent calls through the media gateway over loopback.
+
+Starts media_gateway.MediaGateway in-process with a stand-in turn loop
+(fixed transcript, tone as TTS) and opens N WebSocket streams that send
+20 ms frames in real time: a second of tone, then silence, so the
+gateway's VAD ends each utterance. Reports client-side egress jitter and
+underruns (gaps in the agent's audio mid-utterance) plus the gateway's
+per-stream ingress stats.
+
+    python bench_media_streams.py --streams 50 --seconds 15 --codec mulaw8k
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+import numpy as np
+
+from media_gateway import CODECS, FRAME_MS, MediaGateway, encode_frame
+
+TTS_RATE = 24000
+
+
+def fake_transcribe(audio):
+    return "okay"
+
+
+def fake_synthesize(text):
+    t = np.arange(int(TTS_RATE * 0.8)) / TTS_RATE
+    return (0.3 * np.sin(2 * np.pi * 440 * t)).astype(np.float32), TTS_RATE
+
+
+def echo_call(meta, session):
+    """Stand-in for run_conversation: greet, then answer every utterance."""
+    session.speak("Hello")
+    while True:
+        session.speak(f"You said {session.listen()}")
+
+
+async def caller(url, codec, seconds, results):
+    import websockets
+
+    rate = CODECS[codec]
+    n = rate * FRAME_MS // 1000
+    t = np.arange(n) / rate
+    tone = encode_frame(codec, (0.3 * np.sin(2 * np.pi * 300 * t)).astype(np.float32))
+    silence = encode_frame(codec, np.zeros(n, dtype=np.float32))
+    pattern = [tone] * 50 + [silence] * 60   # 1 s speech, 1.2 s pause
+
+    arrivals = []
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"codec": codec, "client": "bench", "offer": ""}))
+
+        async def receive():
+            try:
+                async for _ in ws:
+                    arrivals.append(time.perf_counter())
+            except websockets.ConnectionClosed:
+                pass
+
+        receiver = asyncio.create_task(receive())
+        period = FRAME_MS / 1000
+        next_tick = time.perf_counter()
+        end = next_tick + seconds
+        i = 0
+        while time.perf_counter() < end:
+            await ws.send(pattern[i % len(pattern)])
+            i += 1
+            next_tick += period
+            await asyncio.sleep(max(0.0, next_tick - time.perf_counter()))
+        receiver.cancel()
+
+    gaps = np.diff(arrivals) if len(arrivals) > 1 else np.zeros(0)
+    # Gaps longer than 200 ms are pauses between agent utterances, not underruns
+    in_utterance = gaps[gaps < 0.2]
+    results.append({
+        "frames_received": len(arrivals),
+        "jitter_ms": float(np.mean(np.abs(in_utterance - period)) * 1000) if len(in_utterance) else 0.0,
+        "underruns": int(np.sum((in_utterance > 2 * period))),
+    })
+
+
+async def run_callers(url, streams, codec, seconds):
+    results = []
+    await asyncio.gather(*(caller(url, codec, seconds, results) for _ in range(streams)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--codec", choices=sorted(CODECS), default="mulaw8k")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    gateway = MediaGateway(echo_call, fake_transcribe, fake_synthesize, max_calls=args.streams)
+    config = uvicorn.Config(gateway.create_app(webrtc=False), host="127.0.0.1", port=args.port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    results = asyncio.run(run_callers(f"ws://127.0.0.1:{args.port}/media", args.streams, args.codec, args.seconds))
+    time.sleep(0.5)
+    server.should_exit = True
+
+    finished = list(gateway.stats()["finished"].values())
+    summary = {
+        "streams": args.streams,
+        "codec": args.codec,
+        "client_egress": {
+            "frames_received_mean": float(np.mean([r["frames_received"] for r in results])),
+            "jitter_ms_mean": round(float(np.mean([r["jitter_ms"] for r in results])), 2),
+            "underruns_total": int(sum(r["underruns"] for r in results)),
+        },
+        "gateway_ingress": {
+            "jitter_ms_mean": round(float(np.mean([s["jitter_ms"] for s in finished])), 2) if finished else None,
+            "max_jitter_ms": max((s["max_jitter_ms"] for s in finished), default=None),
+            "gaps_total": sum(s["gaps"] for s in finished),
+            "pacer_underruns_total": sum(s["underruns"] for s in finished),
+        },
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark: prompt tokens per turn, all-stages prompt vs stage-aware prompt.
+
+Replays a scripted call through both prompts of mvp22_stream.py (prompts.py) and prints
+the prompt size of every turn. Token counts are estimated locally; with
+--ollama each prompt is also sent to llama3.2 and Ollama's own
+prompt_eval_count is reported.
+
+    python bench_prompt_tokens.py
+    python bench_prompt_tokens.py --ollama
+"""
+import argparse
+
+from conversation_stages import ConversationState, estimate_tokens
+from prompts import full_prompt, prompt_inputs, stage_prompt
+
+CLIENT = {"Name": "Sarah Johnson", "LastService": "CRM Integration", "PurchaseDate": "2025-05-16"}
+OFFER = "20% off a marketing automation add-on for existing CRM clients"
+
+SCRIPT = [
+    ("Yes, this is Sarah.", "Hi Sarah! I see you got our CRM Integration back in May - does that sound right?"),
+    ("Yeah, that's right.", "Great, how has it been working for your team?"),
+    ("Pretty well, some sync issues though.", "Sorry to hear that - we can look at those sync issues for you."),
+    ("That would be helpful.", "We also have a marketing automation add-on at 20% off for CRM clients. Interested?"),
+    ("Maybe, send me some details.", "Happy to. Could we set up a short call next week to walk through it?"),
+    ("Actually I'm not interested right now.", "No problem at all, thank you for your time today."),
+]
+
+
+def ollama_prompt_tokens(llm, prompt):
+    return llm.generate(prompt, num_predict=1).get("prompt_eval_count")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama", action="store_true", help="also report Ollama's prompt_eval_count")
+    args = parser.parse_args()
+
+    llm = None
+    if args.ollama:
+        from llm_gateway import LLMGateway
+        llm = LLMGateway(model="llama3.2", temperature=0.1, deadline=60)
+
+    state = ConversationState(call_id="bench")
+    history = f"Canvi: Hello, this is Canvi from Canvas Digital. May I speak with {CLIENT['Name']}?\n"
+    totals = {"full": 0, "stage": 0}
+
+    print(f"{'turn':>4} {'stage':<13}{'full':>7}{'staged':>8}{'saved':>7}")
+    for turn, (client_text, agent_text) in enumerate(SCRIPT, 1):
+        history += f"Client: {client_text}\n"
+        state.observe_client(client_text)
+
+        inputs = dict(prompt_inputs(CLIENT, OFFER), chat_history=history)
+        full = full_prompt.format(**inputs)
+        staged = stage_prompt.format(**inputs, stage_instructions=state.prompt_section())
+        if llm is not None:
+            full_tokens, stage_tokens = ollama_prompt_tokens(llm, full), ollama_prompt_tokens(llm, staged)
+        else:
+            full_tokens, stage_tokens = estimate_tokens(full), estimate_tokens(staged)
+        totals["full"] += full_tokens
+        totals["stage"] += stage_tokens
+        print(f"{turn:>4} {state.stage:<13}{full_tokens:>7}{stage_tokens:>8}"
+              f"{1 - stage_tokens / full_tokens:>7.0%}")
+
+        history += f"Canvi: {agent_text}\n"
+
+    print(f"total{'':<13}{totals['full']:>7}{totals['stage']:>8}{1 - totals['stage'] / totals['full']:>7.0%}")
+    print(f"transitions: {state.transitions}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Append-only log of call events for campaign analytics.
+
+Every call produces a call_start event, one turn event per exchange
+(client transcript, agent reply, stage, timings) and a call_end event with
+the outcome. log() only puts the event on a queue; a background thread
+batches events, compresses each batch as its own gzip member and appends it
+to the current segment file, so disk I/O never blocks a turn.
+
+Layout under the log root:
+
+    segments/2026-10-19/seg-000001.jsonl.gz   concatenated gzip members
+    index.jsonl                               one line per flushed batch
+
+Each index line records the batch's segment, byte offset and length, date,
+clients and event count, so a query for one client or a date range only
+decompresses the batches that can match. The whole segment is also a valid
+multi-member gzip file, so `zcat segments/*/*.gz` works for ad-hoc digging.
+See query_call_log.py for the query tool.
+"""
+import atexit
+import gzip
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+
+from loguru import logger
+
+LOG_ROOT = os.environ.get("CANVI_CALL_LOG", "call_logs")
+BATCH_SIZE = 256
+FLUSH_INTERVAL = 1.0
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+QUEUE_SIZE = 100_000
+COMPRESS_LEVEL = 6
+
+
+def day_of(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+class CallLog:
+    def __init__(self, root=LOG_ROOT, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                 segment_max_bytes=SEGMENT_MAX_BYTES):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self._segment = None
+        self._segment_date = None
+        self._segment_ids = itertools.count(self._last_segment_id() + 1)
+        self._writer = threading.Thread(target=self._run, name="call-log", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # --- producer side (conversation threads) ---
+
+    def log(self, event):
+        """Queues an event; never blocks. Events are dropped (and counted) if the writer is far behind."""
+        event.setdefault("ts", time.time())
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def open_call(self, client_info, offer="", source=""):
+        return CallRecord(self, client_info, offer, source)
+
+    # --- writer thread ---
+
+    def _last_segment_id(self):
+        segments = os.path.join(self.root, "segments")
+        if not os.path.isdir(segments):
+            return 0
+        ids = [int(name[4:10]) for day in os.listdir(segments)
+               for name in os.listdir(os.path.join(segments, day)) if name.startswith("seg-")]
+        return max(ids, default=0)
+
+    def _segment_path(self, date):
+        # A new segment per day and whenever the current one is full
+        if (self._segment is None or self._segment_date != date
+                or os.path.getsize(self._segment) >= self.segment_max_bytes):
+            directory = os.path.join(self.root, "segments", date)
+            os.makedirs(directory, exist_ok=True)
+            self._segment = os.path.join(directory, f"seg-{next(self._segment_ids):06d}.jsonl.gz")
+            self._segment_date = date
+        return self._segment
+
+    def _write_batch(self, events):
+        by_date = {}
+        for event in events:
+            by_date.setdefault(day_of(event["ts"]), []).append(event)
+
+        index_lines = []
+        for date, batch in by_date.items():
+            payload = "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in batch)
+            member = gzip.compress(payload.encode("utf-8"), compresslevel=COMPRESS_LEVEL)
+            path = self._segment_path(date)
+            with open(path, "ab") as f:
+                offset = f.tell()
+                f.write(member)
+            index_lines.append(json.dumps({
+                "segment": os.path.relpath(path, self.root),
+                "offset": offset,
+                "length": len(member),
+                "date": date,
+                "clients": sorted({e["client"] for e in batch if e.get("client")}),
+                "events": len(batch),
+                "first_ts": batch[0]["ts"],
+                "last_ts": batch[-1]["ts"],
+            }) + "\n")
+
+        # The index is written after the data, so a crash never indexes a partial member
+        with open(os.path.join(self.root, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.writelines(index_lines)
+        self.written += len(events)
+        self.batches += len(index_lines)
+
+    def _run(self):
+        os.makedirs(self.root, exist_ok=True)
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if event is None:
+                    stopping = True
+                    break
+                batch.append(event)
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception:
+                    logger.exception(f"Call log write failed, {len(batch)} events lost")
+                    self.dropped += len(batch)
+
+    def close(self):
+        """Flushes queued events and stops the writer."""
+        if self._writer.is_alive():
+            self.queue.put(None)
+            self._writer.join()
+
+    def stats(self):
+        return {"written": self.written, "batches": self.batches,
+                "queued": self.queue.qsize(), "dropped": self.dropped}
+
+
+class CallRecord:
+    """Logs the events of one call."""
+
+    def __init__(self, log, client_info, offer="", source=""):
+        self.log = log
+        self.call_id = uuid.uuid4().hex[:12]
+        self.client = client_info.get("Name", "Unknown")
+        self.started = time.time()
+        self.turns = 0
+        self._emit("call_start", offer=offer, source=source, client_info=client_info)
+
+    def _emit(self, event_type, **fields):
+        self.log.log({"type": event_type, "call_id": self.call_id, "client": self.client, **fields})
+
+    def turn(self, transcript, reply, stage=None, timings=None, cached=False):
+        """One exchange; timings are seconds per step, e.g. {"listen": 2.1, "reply": 0.8}."""
+        self.turns += 1
+        self._emit("turn", turn=self.turns, transcript=transcript, reply=reply, stage=stage,
+                   timings={k: round(v, 3) for k, v in (timings or {}).items()}, cached=cached)
+
+    def end(self, outcome, stage=None, **fields):
+        self._emit("call_end", outcome=outcome, stage=stage, turns=self.turns,
+                   duration=round(time.time() - self.started, 3), **fields)
+
+
+# --- Reading ---
+
+def read_index(root=LOG_ROOT):
+    path = os.path.join(root, "index.jsonl")
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def scan(root=LOG_ROOT, client=None, since=None, until=None, event_type=None):
+    """Yields logged events, decompressing only the batches the index says can match.
+
+    client matches case-insensitively as a substring; since/until are
+    YYYY-MM-DD dates (inclusive).
+    """
+    needle = client.lower() if client else None
+    handles = {}
+    try:
+        for entry in read_index(root):
+            if since and entry["date"] < since or until and entry["date"] > until:
+                continue
+            if needle and not any(needle in c.lower() for c in entry["clients"]):
+                continue
+            f = handles.get(entry["segment"])
+            if f is None:
+                f = handles[entry["segment"]] = open(os.path.join(root, entry["segment"]), "rb")
+            f.seek(entry["offset"])
+            data = zlib.decompress(f.read(entry["length"]), wbits=31)
+            for line in data.splitlines():
+                event = json.loads(line)
+                if event_type and event["type"] != event_type:
+                    continue
+                if needle and needle not in event.get("client", "").lower():
+                    continue
+                yield event
+    finally:
+        for f in handles.values():
+            f.close()
@@ -0,0 +1,165 @@
+"""Bulk resolution of a dial list to client records.
+
+find_client() costs one embedding round-trip and one vector query per name,
+which is fine for one typed name and slow for a day's list of thousands.
+ClientResolver.resolve() takes the whole list at once:
+
+1. de-duplicates it (case and whitespace insensitive),
+2. resolves exact record ids and exact client names without embedding,
+3. embeds the rest in batches, several batches in flight at once,
+4. searches all query vectors in one vectorized pass over the
+   embedding_index.EmbeddingIndex of client records,
+5. buckets every name as matched (with a confidence score), ambiguous
+   (top candidates too close or too weak) or missing.
+
+The thresholds are cosine similarities between "Record for <name>" texts
+(the client documents' page_content, see vector.py) under
+mxbai-embed-large; re-check them with `bench_client_resolver.py --ollama`
+when the embedding model changes.
+"""
+import csv
+import re
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DOCUMENT_TEMPLATE = "Record for {}"
+BATCH_SIZE = 64
+WORKERS = 4
+CANDIDATES = 3
+MATCH_THRESHOLD = 0.88      # top score needed for a confident match
+MISSING_THRESHOLD = 0.80    # below this nothing in the records is close
+MARGIN = 0.015              # a runner-up (different client) this close makes the match ambiguous
+
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name):
+    return _SPACES.sub(" ", str(name)).strip().lower()
+
+
+def read_names(path):
+    """Names/ids from a text file (one per line, # comments) or a CSV with a Name column.
+
+    Raises OSError if the file can't be read and ValueError for a CSV without a header row.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            reader = csv.DictReader(f)
+            if not reader.fieldnames:
+                raise ValueError(f"{path} is empty or has no header row (expected a Name column)")
+            column = "Name" if "Name" in reader.fieldnames else reader.fieldnames[0]
+            return [row[column].strip() for row in reader if row.get(column, "").strip()]
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+class ClientResolver:
+    def __init__(self, index, embed_documents, batch_size=BATCH_SIZE, workers=WORKERS,
+                 match_threshold=MATCH_THRESHOLD, missing_threshold=MISSING_THRESHOLD, margin=MARGIN):
+        self.index = index
+        self.embed_documents = embed_documents
+        self.batch_size = batch_size
+        self.workers = workers
+        self.match_threshold = match_threshold
+        self.missing_threshold = missing_threshold
+        self.margin = margin
+        self.by_id = {record_id: row for row, record_id in enumerate(index.ids)}
+        self.by_name = defaultdict(list)
+        for row, metadata in enumerate(index.metadatas):
+            if metadata and metadata.get("Name"):
+                self.by_name[normalize_name(metadata["Name"])].append(row)
+
+    def _candidate(self, row, score):
+        metadata = self.index.metadatas[row]
+        return {"id": self.index.ids[row], "name": metadata.get("Name"), "score": round(float(score), 4),
+                "record": metadata}
+
+    def _embed(self, texts):
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            vectors = list(pool.map(self.embed_documents, batches))
+        return np.concatenate([np.asarray(v, dtype=np.float32) for v in vectors]), len(batches)
+
+    def _classify(self, hits):
+        """matched / ambiguous / missing from the candidates of one query, best first."""
+        top_score = hits[0][1] if hits else 0.0
+        if top_score < self.missing_threshold:
+            return "missing"
+        top_name = hits[0][2].get("Name")
+        runner_up = next((h for h in hits[1:] if h[2].get("Name") != top_name), None)
+        if top_score < self.match_threshold or (runner_up and top_score - runner_up[1] < self.margin):
+            return "ambiguous"
+        return "matched"
+
+    def resolve(self, queries):
+        """Returns {"matched": {query: candidate}, "ambiguous": {query: [candidates]}, "missing": [query], "stats"}.
+
+        Every original query appears once in the output (duplicates share a result).
+        """
+        start = time.perf_counter()
+        unique = {}
+        for query in queries:
+            unique.setdefault(normalize_name(query), query)
+
+        result = {"matched": {}, "ambiguous": {}, "missing": []}
+        pending = []
+        exact = 0
+        for key, query in unique.items():
+            if not key:
+                continue
+            if query.strip() in self.by_id:
+                result["matched"][query] = dict(self._candidate(self.by_id[query.strip()], 1.0), method="id")
+                exact += 1
+            elif len(self.by_name.get(key, ())) == 1:
+                result["matched"][query] = dict(self._candidate(self.by_name[key][0], 1.0), method="exact")
+                exact += 1
+            elif len(self.by_name.get(key, ())) > 1:
+                # Same name on several records: only the operator can tell which one
+                result["ambiguous"][query] = [self._candidate(row, 1.0) for row in self.by_name[key]]
+                exact += 1
+            else:
+                pending.append(query)
+
+        batches = 0
+        if pending:
+            vectors, batches = self._embed([DOCUMENT_TEMPLATE.format(q.strip()) for q in pending])
+            for query, hits in zip(pending, self.index.search_batch(vectors, k=CANDIDATES)):
+                bucket = self._classify(hits)
+                if bucket == "missing":
+                    result["missing"].append(query)
+                    continue
+                candidates = [dict(self._candidate(self.by_id[h[0]], h[1]), method="vector") for h in hits
+                              if h[1] >= self.missing_threshold]
+                if bucket == "matched":
+                    result["matched"][query] = candidates[0]
+                else:
+                    result["ambiguous"][query] = candidates
+
+        # Other spellings of a de-duplicated name share its result
+        missing = set(result["missing"])
+        for query in queries:
+            first = unique.get(normalize_name(query))
+            if first is None or first == query:
+                continue
+            if first in result["matched"]:
+                result["matched"][query] = result["matched"][first]
+            elif first in result["ambiguous"]:
+                result["ambiguous"][query] = result["ambiguous"][first]
+            elif first in missing and query not in missing:
+                result["missing"].append(query)
+                missing.add(query)
+
+        result["stats"] = {
+            "queries": len(queries),
+            "unique": len(unique),
+            "exact": exact,
+            "embedded": len(pending),
+            "embed_batches": batches,
+            "matched": sum(1 for q in unique.values() if q in result["matched"]),
+            "ambiguous": sum(1 for q in unique.values() if q in result["ambiguous"]),
+            "missing": sum(1 for q in unique.values() if q in missing),
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        return result
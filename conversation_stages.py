@@ -0,0 +1,119 @@
+"""Explicit call-stage state machine.
+
+Instead of sending the instructions for all four stages on every turn and
+letting the model infer where it is from the raw history, the agent tracks
+the current stage itself and only sends that stage's instructions plus the
+stages it may move to next. The stage advances on cheap signals from the
+client's words, on a per-stage turn limit, or on a [STAGE: NAME] hint the
+model puts at the start of its reply.
+"""
+import re
+
+from loguru import logger
+
+INTRODUCTION = "INTRODUCTION"
+CONFIRMATION = "CONFIRMATION"
+ENGAGEMENT = "ENGAGEMENT"
+CLOSING = "CLOSING"
+
+STAGE_INSTRUCTIONS = {
+    INTRODUCTION: "Greet the client politely and introduce yourself.",
+    CONFIRMATION: "Briefly and politely confirm their last purchased service and date. "
+                  "Acknowledge their response, whether they remember or not.",
+    ENGAGEMENT: "Present the new opportunity, ask about their satisfaction with past services and "
+                "their current needs. If they mention a problem or interest, be reassuring and "
+                "solution-oriented and aim to schedule a follow-up meeting. Handle objections politely.",
+    CLOSING: "Thank the client for their time and end the call gracefully. If nothing more can be "
+             "done, end your response with the phrase \"GOODBYE_CALL\". If the client re-engages, "
+             "continue the conversation instead.",
+}
+
+TRANSITIONS = {
+    INTRODUCTION: (CONFIRMATION, CLOSING),
+    CONFIRMATION: (ENGAGEMENT, CLOSING),
+    ENGAGEMENT: (CLOSING,),
+    CLOSING: (ENGAGEMENT,),
+}
+
+# Client turns after which a stage moves on by itself (None = no limit)
+MAX_CLIENT_TURNS = {INTRODUCTION: 1, CONFIRMATION: 2, ENGAGEMENT: None, CLOSING: None}
+
+# Asking not to be called ends the call from any stage
+DO_NOT_CALL = re.compile(
+    r"\b(don'?t call|stop calling|remove me|take me off|leave me alone)\b", re.IGNORECASE)
+# Turning the offer down only counts once it has been presented ("no thanks" to a
+# confirmation question is not a refusal); "we're good" / "not right now" are too
+# often satisfaction or a scheduling answer to end a call on
+NOT_INTERESTED = re.compile(r"\b(not interested|no thanks|no thank you)\b", re.IGNORECASE)
+DECLINE_STAGES = (ENGAGEMENT,)
+RE_ENGAGE = re.compile(r"\b(actually|wait|tell me more|what (is|was) (it|the offer)|interested)\b", re.IGNORECASE)
+STAGE_HINT = re.compile(r"\[STAGE:\s*([A-Z]+)\s*\]\s*", re.IGNORECASE)
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Rough BPE token count (words and punctuation), good enough to compare prompts."""
+    return len(_TOKEN.findall(text))
+
+
+class ConversationState:
+    def __init__(self, call_id=""):
+        self.call_id = call_id
+        self.stage = INTRODUCTION
+        self.turn = 0
+        self.stage_turns = 0
+        self.transitions = []
+        self.prompt_tokens = []
+
+    def move_to(self, stage, reason):
+        if stage == self.stage or stage not in TRANSITIONS[self.stage]:
+            return False
+        self.transitions.append({"turn": self.turn, "from": self.stage, "to": stage, "reason": reason})
+        logger.info(f"Call {self.call_id} stage {self.stage} -> {stage} ({reason}) at turn {self.turn}")
+        self.stage = stage
+        self.stage_turns = 0
+        return True
+
+    def observe_client(self, text):
+        """Updates the stage from the client's words before the LLM is asked."""
+        self.turn += 1
+        self.stage_turns += 1
+        if DO_NOT_CALL.search(text):
+            self.move_to(CLOSING, "client asked not to be called")
+        elif self.stage in DECLINE_STAGES and NOT_INTERESTED.search(text):
+            self.move_to(CLOSING, "client not interested")
+        elif self.stage == CLOSING and RE_ENGAGE.search(text):
+            self.move_to(ENGAGEMENT, "client re-engaged")
+        else:
+            limit = MAX_CLIENT_TURNS[self.stage]
+            if limit is not None and self.stage_turns >= limit:
+                self.move_to(TRANSITIONS[self.stage][0], "turn limit")
+
+    def observe_reply(self, reply):
+        """Applies and strips a [STAGE: NAME] hint from the model's reply."""
+        match = STAGE_HINT.search(reply)
+        if not match:
+            return reply
+        self.move_to(match.group(1).upper(), "llm hint")
+        return STAGE_HINT.sub("", reply).strip()
+
+    def prompt_section(self):
+        """Instructions for the current stage and the transitions open from it."""
+        allowed = ", ".join(TRANSITIONS[self.stage])
+        return (f"**Current stage: {self.stage}** - {STAGE_INSTRUCTIONS[self.stage]}\n"
+                f"    If your reply moves the call to another stage ({allowed}), "
+                f"start it with [STAGE: <name>].")
+
+    def record_prompt(self, prompt):
+        self.prompt_tokens.append(estimate_tokens(prompt))
+
+    def summary(self):
+        tokens = self.prompt_tokens
+        return {
+            "final_stage": self.stage,
+            "turns": self.turn,
+            "transitions": self.transitions,
+            "prompt_tokens_total": sum(tokens),
+            "prompt_tokens_mean": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+        }
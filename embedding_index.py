@@ -0,0 +1,263 @@
+"""Compact in-memory embedding index with exact re-ranking.
+
+mxbai-embed-large vectors are 1024 float32s (4 KB each). This index keeps
+only a quantized copy in RAM and the float32 originals in a memory-mapped
+file on disk:
+
+- precision "int8": one byte per dimension plus a float32 scale per vector
+  (~4x smaller); "float16": two bytes per dimension (2x smaller, but
+  numpy's half-float upcast makes its scan several times slower);
+  "float32": the unquantized baseline.
+- search(): a vectorized scan over the quantized copy finds the top
+  k * rerank candidates, which are then re-scored exactly against the
+  float32 originals. Only those rows of the memmap are read.
+- mode "hnsw": candidates come from an hnswlib graph instead of the scan
+  (M, ef_construction, ef_search configurable). The graph keeps its own
+  float32 copy, so it trades memory for sub-linear query time.
+
+Vectors are L2-normalized and scored by cosine similarity. The index is
+built from a Chroma collection's stored embeddings (no re-embedding) and
+cached next to the store until the collection changes.
+
+Chroma's own HNSW parameters are set at build time with
+chroma_hnsw_metadata() (see vector.py).
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from loguru import logger
+
+PRECISIONS = ("float32", "float16", "int8")
+RERANK = 4             # candidates re-scored exactly = k * RERANK
+SCAN_CHUNK = 256       # rows upcast per step; the 1 MB float32 buffer stays in L2
+SCORE_BLOCK = 1 << 22  # query x row scores held at once (16 MB of float32)
+
+HNSW_M = int(os.environ.get("CANVI_HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.environ.get("CANVI_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.environ.get("CANVI_HNSW_EF_SEARCH", "64"))
+
+
+def chroma_hnsw_metadata(M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
+    """collection_metadata for Chroma's own HNSW index (only applies when the collection is created)."""
+    return {"hnsw:M": M, "hnsw:construction_ef": ef_construction, "hnsw:search_ef": ef_search}
+
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def quantize(vectors, precision):
+    """Returns (codes, per-row scales or None)."""
+    if precision == "float32":
+        return vectors, None
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    if precision == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unknown precision {precision!r}, expected one of {PRECISIONS}")
+
+
+def content_fingerprint(ids, metadatas=None, documents=None, model=""):
+    """Hash of the records and the embedding model, so edited records or a new model invalidate the cache.
+
+    The vectors aren't hashed: they follow from the documents and the model, and
+    not reading them at startup is what the cache is for.
+    """
+    digest = hashlib.sha1()
+    digest.update(f"{len(ids)}\n{model}\n".encode("utf-8"))
+    digest.update("\n".join(ids).encode("utf-8"))
+    digest.update(json.dumps([metadatas, documents], sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingIndex:
+    def __init__(self, precision="int8", mode="flat", rerank=RERANK,
+                 M=HNSW_M, ef_construction=HNSW_EF_CONSTRUCTION, ef_search=HNSW_EF_SEARCH):
+        if mode not in ("flat", "hnsw"):
+            raise ValueError(f"Unknown mode {mode!r}, expected 'flat' or 'hnsw'")
+        self.precision = precision
+        self.mode = mode
+        self.rerank = rerank
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.ids = []
+        self.metadatas = []
+        self.documents = []
+        self.codes = None
+        self.scales = None
+        self.full = None
+        self.graph = None
+        self.fingerprint = None
+        self.build_seconds = 0.0
+
+    def __len__(self):
+        return len(self.ids)
+
+    # --- building ---
+
+    def build(self, ids, vectors, metadatas=None, documents=None, directory=None):
+        """Indexes vectors; the float32 originals go to directory/full.npy (memory-mapped) if given."""
+        start = time.perf_counter()
+        vectors = normalize(vectors)
+        self.ids = list(ids)
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.ids]
+        self.documents = list(documents) if documents is not None else ["" for _ in self.ids]
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            np.save(os.path.join(directory, "full.npy"), vectors)
+            self.full = np.load(os.path.join(directory, "full.npy"), mmap_mode="r")
+        else:
+            self.full = vectors
+
+        if self.mode == "hnsw":
+            import hnswlib
+            self.graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+            self.graph.init_index(max_elements=max(len(vectors), 1), M=self.M, ef_construction=self.ef_construction)
+            if len(vectors):
+                self.graph.add_items(vectors, np.arange(len(vectors)))
+        else:
+            self.codes, self.scales = quantize(vectors, self.precision)
+        self.build_seconds = time.perf_counter() - start
+        return self
+
+    @classmethod
+    def from_chroma(cls, vectorstore, where=None, directory=None, **options):
+        """Builds (or loads the cached) index over a langchain Chroma store's collection."""
+        collection = vectorstore._collection
+        model = getattr(getattr(vectorstore, "embeddings", None), "model", "")
+        # Ids, metadatas and documents only: the float32 vectors are read just when rebuilding
+        data = collection.get(where=where, include=["metadatas", "documents"])
+        fingerprint = content_fingerprint(data["ids"], data["metadatas"], data["documents"], model)
+        index = cls(**options)
+        if not data["ids"]:
+            return index
+        if directory is not None:
+            # Separate instance: a stale cache's full.npy memmap must be released before
+            # build() writes over it (an open mapping blocks the overwrite on Windows)
+            cached = cls(**options).load(directory)
+            if cached is not None and cached.fingerprint == fingerprint:
+                logger.info(f"Embedding index loaded from {directory} ({len(cached)} vectors)")
+                return cached
+            if cached is not None:
+                cached.full = None
+        data = collection.get(where=where, include=["embeddings", "metadatas", "documents"])
+        fingerprint = content_fingerprint(data["ids"], data["metadatas"], data["documents"], model)
+        index.build(data["ids"], data["embeddings"], data["metadatas"], data["documents"], directory)
+        index.fingerprint = fingerprint
+        if directory is not None:
+            index.save(directory)
+        logger.info(f"Embedding index built: {len(index)} vectors, {index.precision}/{index.mode}, "
+                    f"{index.memory_bytes() / 1e6:.1f} MB in {index.build_seconds:.2f}s")
+        return index
+
+    # --- persistence ---
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        if self.full is not None and not isinstance(self.full, np.memmap):
+            np.save(os.path.join(directory, "full.npy"), self.full)
+        if self.graph is not None:
+            self.graph.save_index(os.path.join(directory, "hnsw.bin"))
+        else:
+            np.save(os.path.join(directory, "codes.npy"), self.codes)
+            if self.scales is not None:
+                np.save(os.path.join(directory, "scales.npy"), self.scales)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"precision": self.precision, "mode": self.mode, "M": self.M,
+                       "ef_construction": self.ef_construction, "fingerprint": self.fingerprint,
+                       "ids": self.ids, "metadatas": self.metadatas, "documents": self.documents}, f)
+
+    def load(self, directory):
+        """Loads a saved index built with the same precision/mode/M, or returns None."""
+        try:
+            with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (meta["precision"], meta["mode"], meta["M"], meta["ef_construction"]) != \
+                (self.precision, self.mode, self.M, self.ef_construction):
+            return None
+        self.ids, self.metadatas, self.documents = meta["ids"], meta["metadatas"], meta["documents"]
+        self.fingerprint = meta["fingerprint"]
+        self.full = np.load(os.path.join(directory, "full.npy"), mmap_mode="r")
+        if self.mode == "hnsw":
+            import hnswlib
+            self.graph = hnswlib.Index(space="ip", dim=self.full.shape[1])
+            self.graph.load_index(os.path.join(directory, "hnsw.bin"), max_elements=max(len(self.ids), 1))
+        else:
+            self.codes = np.load(os.path.join(directory, "codes.npy"))
+            scales = os.path.join(directory, "scales.npy")
+            self.scales = np.load(scales) if os.path.exists(scales) else None
+        return self
+
+    # --- searching ---
+
+    def _scan(self, queries, count):
+        """Top `count` rows per query by (approximate) score over the quantized copy."""
+        n = len(self.codes)
+        rows = []
+        # Full score rows for a block of queries, then one partition per block: per-chunk
+        # top-k bookkeeping costs more than the scan itself for single queries
+        block = max(1, SCORE_BLOCK // max(n, 1))
+        upcast = self.codes.dtype != np.float32
+        step = SCAN_CHUNK if upcast else max(n, 1)
+        # Upcast into one reused, cache-sized buffer instead of a fresh float32 copy per chunk
+        buffer = np.empty((min(step, n), self.codes.shape[1]), dtype=np.float32) if upcast else None
+        for q in range(0, len(queries), block):
+            part = queries[q:q + block]
+            scores = np.empty((len(part), n), dtype=np.float32)
+            for start in range(0, n, step):
+                chunk = self.codes[start:start + step]
+                if upcast:
+                    np.copyto(buffer[:len(chunk)], chunk)
+                    chunk = buffer[:len(chunk)]
+                np.matmul(part, chunk.T, out=scores[:, start:start + len(chunk)])
+            if self.scales is not None:
+                scores *= self.scales
+            rows.append(np.argpartition(-scores, count - 1, axis=1)[:, :count])
+        return np.concatenate(rows)
+
+    def search_batch(self, queries, k=4):
+        """For each query vector, [(id, cosine score, metadata, document)] best first."""
+        if not self.ids:
+            return [[] for _ in queries]
+        queries = normalize(np.atleast_2d(queries))
+        count = min(len(self.ids), max(k, k * self.rerank))
+        if self.graph is not None:
+            self.graph.set_ef(max(self.ef_search, count))
+            rows, _ = self.graph.knn_query(queries, k=count)
+            rows = rows.astype(np.int64)
+        else:
+            rows = self._scan(queries, count)
+
+        # Exact re-ranking: read each candidate's float32 row once
+        unique, inverse = np.unique(rows, return_inverse=True)
+        exact = np.asarray(self.full[unique]) @ queries.T          # (unique, m)
+        scores = exact[inverse.reshape(rows.shape), np.arange(len(queries))[:, None]]
+        order = np.argsort(-scores, axis=1)[:, :k]
+
+        results = []
+        for q in range(len(queries)):
+            results.append([(self.ids[rows[q, j]], float(scores[q, j]),
+                             self.metadatas[rows[q, j]], self.documents[rows[q, j]]) for j in order[q]])
+        return results
+
+    def search(self, query, k=4):
+        return self.search_batch([query], k)[0]
+
+    def memory_bytes(self):
+        """Resident size of the search structures (the float32 memmap stays on disk)."""
+        if self.graph is not None:
+            # hnswlib level-0 element: vector + 2M links + link count + label
+            per_element = self.full.shape[1] * 4 + 2 * self.M * 4 + 4 + 8
+            return len(self.ids) * per_element
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
@@ -0,0 +1,178 @@
+"""Async LLM gateway in front of one or more local Ollama servers.
+
+- pooled keep-alive HTTP connections (one httpx.AsyncClient per endpoint)
+- a hard per-turn deadline, so a stuck generation can't freeze the call
+- hedged requests: if the first replica hasn't answered after `hedge_after`
+  seconds, the same prompt goes to a second replica and the first answer wins
+- routing by least in-flight requests, ties broken by recent latency
+- queue/latency metrics per endpoint
+
+The scripts are synchronous, so the gateway runs its event loop in a
+background thread and invoke() blocks like OllamaLLM.invoke() does.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+import httpx
+from loguru import logger
+
+DEFAULT_ENDPOINTS = os.environ.get("OLLAMA_ENDPOINTS", "http://localhost:11434").split(",")
+TURN_DEADLINE = 8.0   # seconds before a turn gives up on the LLM
+WARMUP_DEADLINE = 120.0  # a cold start loads the model from disk first
+HEDGE_AFTER = 1.5     # seconds before a second replica is asked
+LATENCY_WINDOW = 200  # recent latencies kept per endpoint for percentiles
+
+
+class Endpoint:
+    def __init__(self, url, max_connections):
+        self.url = url.rstrip("/")
+        self.client = None
+        self.max_connections = max_connections
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def open(self):
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        self.client = httpx.AsyncClient(base_url=self.url, limits=limits, timeout=None)
+
+    @property
+    def recent_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def metrics(self):
+        ordered = sorted(self.latencies)
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 1) if ordered else None
+
+        return {"in_flight": self.in_flight, "requests": self.requests, "errors": self.errors,
+                "p50_ms": pct(0.5), "p95_ms": pct(0.95)}
+
+
+class LLMGateway:
+    def __init__(self, model="llama3.2", temperature=0.1, endpoints=None,
+                 deadline=TURN_DEADLINE, hedge_after=HEDGE_AFTER, max_connections=4):
+        self.model = model
+        self.options = {"temperature": temperature}
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self.endpoints = [Endpoint(url, max_connections) for url in (endpoints or DEFAULT_ENDPOINTS)]
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="llm-gateway", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open(), self.loop).result()
+
+    async def _open(self):
+        for endpoint in self.endpoints:
+            endpoint.open()
+
+    # --- routing ---
+
+    def _ranked(self, exclude=None):
+        candidates = [e for e in self.endpoints if e is not exclude]
+        return sorted(candidates, key=lambda e: (e.in_flight, e.recent_latency))
+
+    async def _call(self, endpoint, prompt, options):
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        start = time.perf_counter()
+        try:
+            resp = await endpoint.client.post("/api/generate", json={
+                "model": self.model, "prompt": prompt, "stream": False,
+                "options": dict(self.options, **options),
+            })
+            resp.raise_for_status()
+            endpoint.latencies.append(time.perf_counter() - start)
+            return resp.json()
+        except Exception:
+            endpoint.errors += 1
+            raise
+        finally:
+            endpoint.in_flight -= 1
+
+    async def agenerate(self, prompt, deadline=None, **options):
+        """Returns Ollama's /api/generate response dict, hedging if the first replica is slow."""
+        try:
+            return await asyncio.wait_for(self._race(prompt, options), deadline or self.deadline)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _race(self, prompt, options):
+        ranked = self._ranked()
+        primary = asyncio.ensure_future(self._call(ranked[0], prompt, options))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done or primary.exception() is not None:
+                backup = self._ranked(exclude=ranked[0])
+                if backup:
+                    self.hedges += 1
+                    tasks.add(asyncio.ensure_future(self._call(backup[0], prompt, options)))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        return task.result()
+                last_error = next(iter(done)).exception()
+            raise last_error
+        finally:
+            # The losing (or timed-out) request is cancelled so its connection frees up
+            for task in tasks:
+                task.cancel()
+
+    # --- sync API used by the scripts ---
+
+    def generate(self, prompt, deadline=None, **options):
+        future = asyncio.run_coroutine_threadsafe(self.agenerate(prompt, deadline, **options), self.loop)
+        return future.result(timeout=(deadline or self.deadline) + 1.0)
+
+    def invoke(self, prompt, deadline=None, **options):
+        """Drop-in for OllamaLLM.invoke(): returns the generated text."""
+        return self.generate(prompt, deadline, **options)["response"]
+
+    def broadcast(self, prompt, deadline=None, **options):
+        """Sends the prompt to every replica (e.g. to prime each one's prompt cache).
+
+        Returns one response dict or exception per endpoint; past the deadline
+        every request is cancelled and reported as a TimeoutError.
+        """
+        deadline = deadline or self.deadline
+
+        async def _all():
+            try:
+                return await asyncio.wait_for(
+                    asyncio.gather(*(self._call(e, prompt, options) for e in self.endpoints),
+                                   return_exceptions=True), deadline)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                return [TimeoutError(f"broadcast exceeded {deadline}s") for _ in self.endpoints]
+        return asyncio.run_coroutine_threadsafe(_all(), self.loop).result(timeout=deadline + 1.0)
+
+    def metrics(self):
+        return {
+            "queue": sum(e.in_flight for e in self.endpoints),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "timeouts": self.timeouts,
+            "endpoints": {e.url: e.metrics() for e in self.endpoints},
+        }
+
+    def close(self):
+        async def _close():
+            for endpoint in self.endpoints:
+                await endpoint.client.aclose()
+        asyncio.run_coroutine_threadsafe(_close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        logger.info(f"LLM gateway metrics: {self.metrics()}")
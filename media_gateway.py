@@ -0,0 +1,374 @@
+"""Network audio ingress/egress so the agent can take real calls.
+
+Two transports feed the same per-call CallSession:
+
+- /media WebSocket: the client sends one JSON start message
+  {"codec": "mulaw8k" | "pcm16k", "client": "<name>", "offer": "<details>"}
+  and then binary 20 ms frames (8 kHz mu-law bytes or 16 kHz little-endian
+  int16). Agent speech comes back in the same codec and frame size, paced
+  in real time. Easy to drive over loopback (see bench_media_streams.py).
+- WebRTC (plus fastrtc's telephone/websocket routes) through a fastrtc
+  StreamHandler mounted on the same FastAPI app.
+
+CallSession exposes listen()/speak() like audio_workers.AudioWorkers, so the
+existing turn loop in mvp22_stream.run_conversation drives network calls
+unchanged. Codec conversion and resampling are vectorized numpy; every
+stream keeps its own ingress jitter and egress underrun counters.
+"""
+import asyncio
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+
+FRAME_MS = 20
+CODECS = {"mulaw8k": 8000, "pcm16k": 16000}
+STT_RATE = 16000
+SILENCE_THRESHOLD = 0.01
+SILENCE_DURATION = 1.0
+MAX_UTTERANCE_SECONDS = 30
+
+
+class CallEnded(Exception):
+    """Raised from listen() once the remote side has hung up."""
+
+
+# --- Codecs and resampling ---
+
+def _ulaw_decode_table():
+    codes = ~np.arange(256, dtype=np.uint8)
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa.astype(np.int32) << 3) + 0x84) << exponent) - 0x84
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.float32) / 32768.0
+
+
+ULAW_DECODE = _ulaw_decode_table()
+
+
+def ulaw_decode(data):
+    """G.711 mu-law bytes -> float32 PCM in [-1, 1]."""
+    return ULAW_DECODE[np.frombuffer(data, dtype=np.uint8)]
+
+
+_ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def ulaw_encode(pcm):
+    """float32 PCM in [-1, 1] -> G.711 mu-law bytes (bit-exact with the reference coder)."""
+    x = (np.clip(np.asarray(pcm, dtype=np.float32), -1.0, 32767 / 32768) * 32768).astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(x), 8159) + 0x21
+    segment = np.searchsorted(_ULAW_SEGMENT_ENDS, magnitude)
+    code = np.where(segment > 7, 0x7F, (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F))
+    return (code ^ mask).astype(np.uint8).tobytes()
+
+
+def pcm16_decode(data):
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def pcm16_encode(pcm):
+    return (np.clip(pcm, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def decode_frame(codec, data):
+    return ulaw_decode(data) if codec == "mulaw8k" else pcm16_decode(data)
+
+
+def encode_frame(codec, pcm):
+    return ulaw_encode(pcm) if codec == "mulaw8k" else pcm16_encode(pcm)
+
+
+def resample(pcm, src_rate, dst_rate):
+    """Linear-interpolation resampler; integer downsampling averages first to limit aliasing."""
+    pcm = np.asarray(pcm, dtype=np.float32).reshape(-1)
+    if src_rate == dst_rate or len(pcm) == 0:
+        return pcm
+    if src_rate % dst_rate == 0:
+        factor = src_rate // dst_rate
+        usable = len(pcm) - len(pcm) % factor
+        return pcm[:usable].reshape(-1, factor).mean(axis=1)
+    positions = np.arange(0, len(pcm) * dst_rate / src_rate) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(pcm)), pcm).astype(np.float32)
+
+
+# --- Per-stream stats ---
+
+class StreamStats:
+    def __init__(self, frame_seconds):
+        self.frame_seconds = frame_seconds
+        self.last_arrival = None
+        self.jitter = 0.0
+        self.max_jitter = 0.0
+        self.frames_in = 0
+        self.gaps = 0
+        self.frames_out = 0
+        self.underruns = 0
+
+    def on_frame_in(self):
+        now = time.perf_counter()
+        if self.last_arrival is not None:
+            # RFC 3550 interarrival jitter against the nominal frame spacing
+            deviation = abs((now - self.last_arrival) - self.frame_seconds)
+            self.jitter += (deviation - self.jitter) / 16
+            self.max_jitter = max(self.max_jitter, deviation)
+            if now - self.last_arrival > 3 * self.frame_seconds:
+                self.gaps += 1
+        self.last_arrival = now
+        self.frames_in += 1
+
+    def summary(self):
+        return {
+            "frames_in": self.frames_in,
+            "frames_out": self.frames_out,
+            "jitter_ms": round(self.jitter * 1000, 2),
+            "max_jitter_ms": round(self.max_jitter * 1000, 2),
+            "gaps": self.gaps,
+            "underruns": self.underruns,
+        }
+
+
+# --- Call session (transport independent) ---
+
+class CallSession:
+    def __init__(self, stream_id, codec, transcribe, synthesize, meta=None):
+        self.stream_id = stream_id
+        self.codec = codec
+        self.rate = CODECS[codec]
+        self.frame_samples = self.rate * FRAME_MS // 1000
+        self.meta = meta or {}
+        self.transcribe = transcribe
+        self.synthesize = synthesize
+        self.stats = StreamStats(FRAME_MS / 1000)
+
+        self.utterances = queue.Queue()
+        self.listening = False
+        self._frames = []
+        self._silent_frames = 0
+        self._heard_speech = False
+
+        self.egress = deque()
+        self.closed = False
+        self.finished = False
+
+    # ingress (transport threads)
+
+    def receive(self, payload):
+        """One encoded frame from the wire."""
+        self.receive_pcm(decode_frame(self.codec, payload), self.rate)
+
+    def receive_pcm(self, pcm, sample_rate):
+        self.stats.on_frame_in()
+        if not self.listening:
+            return  # half duplex: what comes in while we talk is echo
+        pcm = resample(pcm, sample_rate, STT_RATE)
+        self._frames.append(pcm)
+        if np.max(np.abs(pcm), initial=0.0) < SILENCE_THRESHOLD:
+            self._silent_frames += 1
+        else:
+            self._silent_frames = 0
+            self._heard_speech = True
+
+        silence_limit = SILENCE_DURATION * 1000 / FRAME_MS
+        too_long = len(self._frames) * FRAME_MS / 1000 > MAX_UTTERANCE_SECONDS
+        if (self._heard_speech and self._silent_frames > silence_limit) or too_long:
+            self.listening = False
+            self.utterances.put(np.concatenate(self._frames))
+
+    # turn loop IO (conversation thread)
+
+    def listen(self):
+        """Blocks until the caller finishes an utterance; returns its transcript."""
+        self._frames, self._silent_frames, self._heard_speech = [], 0, False
+        self.listening = True
+        audio = self.utterances.get()
+        if audio is None:
+            raise CallEnded(self.stream_id)
+        return self.transcribe(audio)
+
+    def play(self, pcm, sample_rate):
+        """Queues PCM for egress and blocks until it has been sent."""
+        pcm = resample(pcm, sample_rate, self.rate)
+        done = threading.Event()
+        frames = [pcm[i:i + self.frame_samples] for i in range(0, len(pcm), self.frame_samples)]
+        if frames and len(frames[-1]) < self.frame_samples:
+            frames[-1] = np.pad(frames[-1], (0, self.frame_samples - len(frames[-1])))
+        for frame in frames:
+            self.egress.append((frame, None))
+        self.egress.append((None, done))
+        while not done.wait(0.1):
+            if self.closed:
+                raise CallEnded(self.stream_id)
+
+    def speak(self, text):
+        logger.info(f"[{self.stream_id}] 🔊 Speaking: {text}")
+        pcm, sample_rate = self.synthesize(text)
+        self.play(pcm, sample_rate)
+
+    # egress (transport)
+
+    def next_pcm(self):
+        """Next egress frame as float32 PCM at the stream rate, or None if idle."""
+        while self.egress:
+            frame, done = self.egress.popleft()
+            if done is not None:
+                done.set()
+                continue
+            self.stats.frames_out += 1
+            return frame
+        return None
+
+    def next_frame(self):
+        frame = self.next_pcm()
+        return None if frame is None else encode_frame(self.codec, frame)
+
+    def close(self):
+        self.closed = True
+        self.listening = False
+        self.utterances.put(None)
+
+
+# --- Gateway and transports ---
+
+class MediaGateway:
+    """Creates a CallSession per stream and runs its conversation in a thread."""
+
+    def __init__(self, start_call, transcribe, synthesize, max_calls=32):
+        self.start_call = start_call
+        self.transcribe = transcribe
+        self.synthesize = synthesize
+        self.sessions = {}
+        self.finished_stats = {}
+        self.pool = ThreadPoolExecutor(max_workers=max_calls, thread_name_prefix="call")
+        self._ids = itertools.count(1)
+
+    def open_session(self, codec, meta):
+        if codec not in CODECS:
+            raise ValueError(f"Unsupported codec {codec!r}, expected one of {sorted(CODECS)}")
+        session = CallSession(f"call-{next(self._ids)}", codec, self.transcribe, self.synthesize, meta)
+        self.sessions[session.stream_id] = session
+        self.pool.submit(self._run, session)
+        return session
+
+    def _run(self, session):
+        try:
+            self.start_call(session.meta, session)
+        except CallEnded:
+            logger.info(f"[{session.stream_id}] caller hung up")
+        except Exception:
+            logger.exception(f"[{session.stream_id}] call failed")
+        finally:
+            session.finished = True
+
+    def close_session(self, session):
+        session.close()
+        self.sessions.pop(session.stream_id, None)
+        self.finished_stats[session.stream_id] = session.stats.summary()
+        logger.info(f"[{session.stream_id}] stream stats: {self.finished_stats[session.stream_id]}")
+
+    def stats(self):
+        active = {sid: s.stats.summary() for sid, s in list(self.sessions.items())}
+        return {"active": active, "finished": self.finished_stats}
+
+    async def _pace(self, ws, session):
+        """Sends egress frames on a real-time 20 ms clock."""
+        period = FRAME_MS / 1000
+        next_tick = time.perf_counter()
+        while not (session.finished and not session.egress):
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif session.egress and -delay > period:
+                # We fell more than a frame behind mid-utterance: the far end's
+                # playout buffer has run dry
+                session.stats.underruns += 1
+                next_tick = time.perf_counter()
+            frame = session.next_frame()
+            if frame is not None:
+                await ws.send_bytes(frame)
+        await ws.close()
+
+    def create_app(self, webrtc=True, default_meta=None):
+        """FastAPI app with /media, /stats and (optionally) fastrtc's WebRTC routes.
+
+        WebRTC peers don't send a start message, so their calls use default_meta.
+        """
+        from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+        app = FastAPI(title="Canvi media gateway")
+        gateway = self
+
+        @app.websocket("/media")
+        async def media(ws: WebSocket):
+            await ws.accept()
+            start = json.loads(await ws.receive_text())
+            session = gateway.open_session(start.get("codec", "pcm16k"), start)
+            pacer = asyncio.create_task(gateway._pace(ws, session))
+            try:
+                while True:
+                    message = await ws.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    if message.get("bytes"):
+                        session.receive(message["bytes"])
+            except (WebSocketDisconnect, RuntimeError):
+                pass
+            finally:
+                gateway.close_session(session)
+                pacer.cancel()
+
+        @app.get("/stats")
+        def stats():
+            return gateway.stats()
+
+        if webrtc:
+            mount_webrtc(app, gateway, default_meta)
+        return app
+
+    def serve(self, host="127.0.0.1", port=8765, webrtc=True, default_meta=None):
+        import uvicorn
+        uvicorn.run(self.create_app(webrtc, default_meta), host=host, port=port, log_level="warning")
+
+
+def mount_webrtc(app, gateway, default_meta=None):
+    """Mounts fastrtc's WebRTC and telephone routes, backed by CallSessions."""
+    from fastrtc import Stream, StreamHandler
+
+    class CallHandler(StreamHandler):
+        def __init__(self):
+            super().__init__(expected_layout="mono", output_sample_rate=STT_RATE, input_sample_rate=STT_RATE)
+            self.session = None
+
+        def copy(self):
+            return CallHandler()
+
+        def start_up(self):
+            self.session = gateway.open_session("pcm16k", dict(default_meta or {}))
+
+        def receive(self, frame):
+            if self.session is None:
+                return
+            sample_rate, audio = frame
+            self.session.receive_pcm(audio.reshape(-1).astype(np.float32) / 32768.0, sample_rate)
+
+        def emit(self):
+            if self.session is None:
+                return None
+            pcm = self.session.next_pcm()
+            if pcm is None:
+                return None
+            return STT_RATE, (pcm * 32767).astype(np.int16).reshape(1, -1)
+
+        def shutdown(self):
+            if self.session is not None:
+                gateway.close_session(self.session)
+
+    Stream(handler=CallHandler(), modality="audio", mode="send-receive").mount(app)
@@ -1,29 +1,17 @@
 import speech_recognition as sr
-from gtts import gTTS
-import pygame
-import os
-import tempfile
 import time
-import whisper
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
-from langchain_chroma import Chroma
 from langchain.prompts import PromptTemplate
+from startup import StartupManager, add_agent_components, load_player
 
-db_path = r"chroma_db"
-
-embedding_model = OllamaEmbeddings(model="mxbai-embed-large")
-vectorstore = Chroma(persist_directory=db_path, embedding_function=embedding_model)
+startup = add_agent_components(StartupManager())
 
 def find_client(name_query: str):
     """Retrieves client data by exact name similarity."""
-    docs = vectorstore.similarity_search(name_query, k=1, filter={"Type": "Client"})
+    docs = startup.get("vectorstore").similarity_search(name_query, k=1, filter={"Type": "Client"})
     if not docs:
         return None
     return docs[0].metadata
 
-# LLM setup
-llm = OllamaLLM(model="llama3.2", temperature=0.1)
-
 full_prompt = PromptTemplate(
     template="""
     You are CANVI, a professional and empathetic sales representative from Canvas Digital. You are on a cold call with a client.
@@ -76,59 +64,33 @@ def llm_stage_reply(client_info, chat_history, new_offer_details):
         "chat_history": chat_history,
     }
     
-    return llm.invoke(full_prompt.format(**inputs))
+    return startup.get("llm").invoke(full_prompt.format(**inputs))
 
 # Initialize speech components
 recognizer = sr.Recognizer()
 microphone = sr.Microphone()
 
-# Initialize pygame for audio playback
-pygame.mixer.init()
-
-# Test the speaker
-print("Testing speaker...")
-test_tts = gTTS(text="Speaker test successful", lang='en', slow=False)
-with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-    test_file = fp.name
-    test_tts.save(test_file)
-pygame.mixer.music.load(test_file)
-pygame.mixer.music.play()
-while pygame.mixer.music.get_busy():
-    pygame.time.Clock().tick(10)
-pygame.mixer.music.unload()
-os.unlink(test_file)
-print("Speaker is working")
-
-# Initialize Whisper model
-print("Loading Whisper model...")
-whisper_model = whisper.load_model("base")
-print("Whisper model loaded successfully") 
+startup.add("player", load_player)
 
 def speak(text):
-    """TTS using gTTS"""
+    """TTS decoded and played in memory"""
     print(f"Speaking: {text}")
     try:
-        tts = gTTS(text=text, lang='en', slow=False)
-        
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as fp:
-            temp_file = fp.name
-            tts.save(temp_file)
-        
-        pygame.mixer.music.load(temp_file)
-        pygame.mixer.music.play()
-        
-        while pygame.mixer.music.get_busy():
-            pygame.time.Clock().tick(10)
-        
-        pygame.mixer.music.unload()
-        os.unlink(temp_file)
+        pcm, sample_rate = startup.get("tts").synthesize(text)
+        startup.get("player").play(pcm, sample_rate).wait()
         
         print("Finished speaking")
     except Exception as e:
         print(f"Speech error: {e}")
 
-def recognize_speech_whisper():
-    """Enhanced speech recognition using Whisper for better accuracy"""
+def pcm_from_audio(audio):
+    """speech_recognition AudioData -> float32 mono 16 kHz, the STT backends' input."""
+    import numpy as np
+    raw = audio.get_raw_data(convert_rate=16000, convert_width=2)
+    return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+
+def recognize_speech():
+    """Speech recognition with the selected STT backend, Google as fallback"""
     try:
         with microphone as source:
             recognizer.adjust_for_ambient_noise(source, duration=1)
@@ -137,20 +99,8 @@ def recognize_speech_whisper():
             audio = recognizer.listen(source, timeout=30, phrase_time_limit=30)
             
             try:
-                tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-                tmp_file.write(audio.get_wav_data())
-                tmp_file.close()
-                
-                time.sleep(0.1)
-                
-                print("Processing speech with Whisper...")
-                result = whisper_model.transcribe(tmp_file.name)
-                client_reply = result["text"].strip()
-                
-                try:
-                    os.unlink(tmp_file.name)
-                except:
-                    pass
+                print("Processing speech...")
+                client_reply = startup.get("stt").transcribe(pcm_from_audio(audio)).strip()
                 
                 if client_reply:
                     print(f"Client: {client_reply}")
@@ -158,8 +108,8 @@ def recognize_speech_whisper():
                 else:
                     return ""
                         
-            except Exception as whisper_error:
-                print(f"Whisper failed, falling back to Google: {whisper_error}")
+            except Exception as stt_error:
+                print(f"STT failed, falling back to Google: {stt_error}")
                 client_reply = recognizer.recognize_google(audio)
                 if client_reply:
                     print(f"Client: {client_reply}")
@@ -189,74 +139,86 @@ def cold_call_voice(client_meta, new_offer_details):
     }
 
     conversation_history = ""
+    call = startup.get("call_log").open_call(client_info, new_offer_details, source="voice")
+    outcome = "error"
     print(f"\nCalling {client_info['Name']}...")
     print("=" * 50)
 
-    initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
-    print(f"Canvi: {initial_greeting}")
-    speak(initial_greeting)
-    conversation_history += f"Canvi: {initial_greeting}\n"
+    try:
+        initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
+        print(f"Canvi: {initial_greeting}")
+        speak(initial_greeting)
+        conversation_history += f"Canvi: {initial_greeting}\n"
     
-    while True:
-        client_reply = recognize_speech_whisper()
-
-        if client_reply == "NO_RESPONSE":
-            no_response_count += 1
-            if no_response_count >= max_no_response:
-                response_message = "Sorry, are you there? I can't hear you. I'll end the call now. Goodbye!"
-                print(f"Canvi: {response_message}")
-                speak(response_message)
+        while True:
+            client_reply = recognize_speech()
+
+            if client_reply == "NO_RESPONSE":
+                no_response_count += 1
+                if no_response_count >= max_no_response:
+                    response_message = "Sorry, are you there? I can't hear you. I'll end the call now. Goodbye!"
+                    print(f"Canvi: {response_message}")
+                    speak(response_message)
+                    outcome = "no_response"
+                    break
+                else:                
+                    retry_message = "Sorry, are you there? Can you hear me?"
+                    print(f"Canvi: {retry_message}")
+                    speak(retry_message)
+                    continue 
+            else:
+                no_response_count = 0
+
+            if client_reply.lower().strip() == "bye":
+                goodbye_message = "Thank you for your time. Goodbye!"
+                print(f"Canvi: {goodbye_message}")
+                speak(goodbye_message)
+                outcome = "client_goodbye"
                 break
-            else:                
-                retry_message = "Sorry, are you there? Can you hear me?"
-                print(f"Canvi: {retry_message}")
-                speak(retry_message)
-                continue 
-        else:
-            no_response_count = 0
-
-        if client_reply.lower().strip() == "bye":
-            goodbye_message = "Thank you for your time. Goodbye!"
-            print(f"Canvi: {goodbye_message}")
-            speak(goodbye_message)
-            break
 
-        conversation_history += f"Client: {client_reply}\n"
+            conversation_history += f"Client: {client_reply}\n"
         
-        try:
-            response = llm_stage_reply(client_info, conversation_history, new_offer_details)
-            response = response.strip()
+            try:
+                started = time.perf_counter()
+                response = llm_stage_reply(client_info, conversation_history, new_offer_details)
+                response = response.strip()
+                timings = {"reply": time.perf_counter() - started}
             
-            if response.startswith("Canvi:"):
-                response = response[6:].strip()
+                if response.startswith("Canvi:"):
+                    response = response[6:].strip()
             
-            if not response or response == "":
-                response = "I understand. Let me know if you have any questions about our services."
+                if not response or response == "":
+                    response = "I understand. Let me know if you have any questions about our services."
             
-            if "GOODBYE_CALL" in response:
-                response = response.replace("GOODBYE_CALL", "").strip()
+                if "GOODBYE_CALL" in response:
+                    response = response.replace("GOODBYE_CALL", "").strip()
                 
-                if response:
-                    print(f"Canvi: {response}")
-                    speak(response)
-                    conversation_history += f"Canvi: {response}\n"
+                    if response:
+                        print(f"Canvi: {response}")
+                        speak(response)
+                        conversation_history += f"Canvi: {response}\n"
                 
-                goodbye_message = "Thank you for your time. Goodbye!"
-                print(f"Canvi: {goodbye_message}")
-                speak(goodbye_message)
-                break
+                    goodbye_message = "Thank you for your time. Goodbye!"
+                    print(f"Canvi: {goodbye_message}")
+                    speak(goodbye_message)
+                    call.turn(client_reply, response or goodbye_message, timings=timings)
+                    outcome = "agent_goodbye"
+                    break
             
-            print(f"Canvi: {response}")
-            speak(response)
-            conversation_history += f"Canvi: {response}\n"
+                print(f"Canvi: {response}")
+                speak(response)
+                conversation_history += f"Canvi: {response}\n"
+                call.turn(client_reply, response, timings=timings)
             
-        except Exception as e:
-            print(f"Error: {e}")
-            fallback_response = "I apologize, I'm having trouble processing that. Could you please repeat?"
-            print(f"Canvi: {fallback_response}")
-            speak(fallback_response)
-            conversation_history += f"Canvi: {fallback_response}\n"
-
+            except Exception as e:
+                print(f"Error: {e}")
+                fallback_response = "I apologize, I'm having trouble processing that. Could you please repeat?"
+                print(f"Canvi: {fallback_response}")
+                speak(fallback_response)
+                conversation_history += f"Canvi: {fallback_response}\n"
+                call.turn(client_reply, fallback_response)
+    finally:
+        call.end(outcome)
     print("\nCall ended")
     print("=" * 50)
 
@@ -273,34 +235,51 @@ def cold_call_text(client_meta, new_offer_details):
     }
 
     conversation_history = ""
+    call = startup.get("call_log").open_call(client_info, new_offer_details, source="text")
+    outcome = "error"
     print(f"\nChat with {client_info['Name']} started")
     print("=" * 50)
 
-    initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
-    print(f"Canvi: {initial_greeting}")
-    conversation_history += f"Canvi: {initial_greeting}\n"
+    try:
+        initial_greeting = f"Hello, this is Canvi from Canvas Digital. Hi {client_info['Name']}, how are you doing today?"
+        print(f"Canvi: {initial_greeting}")
+        conversation_history += f"Canvi: {initial_greeting}\n"
     
-    while True:
-        client_reply = input("Client: ")
-        if client_reply.lower() == "bye":
-            print("Canvi: Thank you for your time. Goodbye!")
-            break
+        while True:
+            client_reply = input("Client: ")
+            if client_reply.lower() == "bye":
+                print("Canvi: Thank you for your time. Goodbye!")
+                outcome = "client_goodbye"
+                break
 
-        conversation_history += f"Client: {client_reply}\n"
+            conversation_history += f"Client: {client_reply}\n"
         
-        response = llm_stage_reply(client_info, conversation_history, new_offer_details).strip()
+            started = time.perf_counter()
+            try:
+                response = llm_stage_reply(client_info, conversation_history, new_offer_details).strip()
+            except Exception as e:
+                # e.g. the LLM missed the turn deadline; the chat goes on like the voice call does
+                print(f"Error: {e}")
+                response = "I apologize, I'm having trouble processing that. Could you please repeat?"
+            timings = {"reply": time.perf_counter() - started}
         
-        if "GOODBYE_CALL" in response:
-            print("Canvi: Thank you for your time. Goodbye!")
-            break
+            if "GOODBYE_CALL" in response:
+                print("Canvi: Thank you for your time. Goodbye!")
+                call.turn(client_reply, response, timings=timings)
+                outcome = "agent_goodbye"
+                break
         
-        print(f"Canvi: {response}")
-        conversation_history += f"Canvi: {response}\n"
+            print(f"Canvi: {response}")
+            conversation_history += f"Canvi: {response}\n"
+            call.turn(client_reply, response, timings=timings)
+    finally:
+        call.end(outcome)
 
 
 def main():
     print("Canvas Digital Sales Agent")
     print("=" * 40)
+    startup.start()
     
     query = input("Enter client name: ")
     client_meta = find_client(query)
@@ -316,6 +295,14 @@ def main():
     choice = input("Choose option (1 or 2): ").strip()
 
     new_offer_details = input("Enter new opportunity details: ") 
+
+    needed = ("llm", "stt", "player", "tts") if choice == "1" else ("llm",)
+    for name in needed:
+        try:
+            startup.get(name)
+        except Exception as e:
+            print(f"Failed to load {name}: {e}")
+    startup.report()
     
     if choice == "1":
         try:
@@ -3,104 +3,83 @@ import numpy as np
 import sounddevice as sd
 import queue
 import threading
-from scipy.io import wavfile
-import tempfile
 import os
+import time
 
 from loguru import logger
-from langchain_ollama import OllamaEmbeddings, OllamaLLM
-from langchain_chroma import Chroma
-from langchain.prompts import PromptTemplate
 
-# For STT - using faster-whisper (local)
-from faster_whisper import WhisperModel
+from client_resolver import read_names
+from conversation_stages import ConversationState
+from media_gateway import CallEnded
+from predial import PreDialCache, PreparedCall, prompt_prefix
+from prompts import full_prompt, prompt_inputs, stage_prompt
+from reply_cache import ReplyCache
+from startup import DB_PATH, StartupManager, add_agent_components
 
-# For TTS - using kokoro-onnx (local)
-import kokoro
+# Take calls over the network instead of the local sound card (see media_gateway.py)
+SERVE = "--serve" in sys.argv
+
+# Run capture/playback, STT and TTS in separate worker processes (see audio_workers.py)
+USE_WORKERS = not SERVE and ("--multiprocess" in sys.argv or os.environ.get("CANVI_MULTIPROCESS") == "1")
+
+startup = add_agent_components(StartupManager(), kinds=("llm",) if USE_WORKERS else ("stt", "tts", "llm", "vad"))
 
 # --- RAG/Embedding/LLM setup ---
-db_path = r"chroma_db"
-embedding_model = OllamaEmbeddings(model="mxbai-embed-large")
-vectorstore = Chroma(persist_directory=db_path, embedding_function=embedding_model)
+def load_client_index():
+    # int8 copy of the stored client vectors in RAM, float32 memory-mapped for re-ranking (see embedding_index.py)
+    from embedding_index import EmbeddingIndex
+    return EmbeddingIndex.from_chroma(
+        startup.get("vectorstore"), where={"Type": "Client"}, directory=f"{DB_PATH}_index/clients",
+        precision=os.environ.get("CANVI_INDEX_PRECISION", "int8"),
+        mode=os.environ.get("CANVI_INDEX_MODE", "flat"),
+    )
+
+startup.add("client_index", load_client_index)
+
+def load_client_resolver():
+    # Whole dial lists at once: dedupe, exact matches, batched embeddings (see client_resolver.py)
+    from client_resolver import ClientResolver
+    return ClientResolver(startup.get("client_index"), startup.get("vectorstore").embeddings.embed_documents)
+
+startup.add("client_resolver", load_client_resolver)
 
 def find_client(name_query: str):
-    docs = vectorstore.similarity_search(name_query, k=1, filter={"Type": "Client"})
-    if not docs:
+    """Nearest client record as (record id, metadata), or None."""
+    query = startup.get("vectorstore").embeddings.embed_query(name_query)
+    hits = startup.get("client_index").search(query, k=1)
+    if not hits:
         return None
-    return docs[0].metadata
-
-llm = OllamaLLM(model="llama3.2", temperature=0.1)
-
-full_prompt = PromptTemplate(
-    template="""
-    You are CANVI, a professional and empathetic sales representative from Canvas Digital. You are on a cold call with a client.
-
-    Your goal is to guide the conversation through four stages:
-    1.  **INTRODUCTION**: Greet the client politely and introduce yourself.
-    2.  **CONFIRMATION**: Briefly and politely confirm their last purchased service and date. Acknowledge their response, whether they remember or not.
-    3.  **ENGAGEMENT**: Present an opportunity for future engagement, inquire about their satisfaction with past services, and understand their current needs or interest in future collaborations. If the client mentions a problem or expresses interest, respond with reassuring and solution-oriented language, aiming to schedule a follow-up meeting. Handle objections politely.
-    4.  **CLOSING**: Only if the client explicitly states they are not interested in any future engagement or further discussion, then thank the client for their time and end the call gracefully. If the conversation has reached a natural conclusion where no further action is possible from your end, your response should end with the phrase "GOODBYE_CALL". Otherwise, continue the engagement.
-
-    **CRITICAL RESPONSE RULES:**
-    -   Keep responses SHORT - maximum 1-2 sentences only
-    -   NEVER give long explanations or multiple points in one response
-    -   Ask ONE question at a time
-    -   Speak naturally like in a real phone conversation
-    -   Be conversational, not formal or wordy
-    -   Always maintain a professional yet friendly and empathetic tone
-    -   Acknowledge the client's feelings briefly
-    -   Do not repeat yourself
-    -   Move through the stages logically but naturally
-
-    **Client Data:**
-    -   Name: {client_name}
-    -   Last Service: {last_service}
-    -   Purchase Date: {purchase_date}
-    -   New Opportunity: {new_offer_details}
-
-    **Conversation History:**
-    {chat_history}
-    
-    Generate a SHORT response of maximum 1-2 sentences (do not include "Canvi:" prefix):
-    
-    """,
-    input_variables=[
-        "client_name",
-        "last_service",
-        "purchase_date",
-        "new_offer_details",
-        "chat_history",
-    ],
-)
-
-def llm_stage_reply(client_info, chat_history, new_offer_details):
-    inputs = {
-        "client_name": client_info["Name"],
-        "last_service": client_info["LastService"],
-        "purchase_date": client_info["PurchaseDate"],
-        "new_offer_details": new_offer_details,
-        "chat_history": chat_history,
-    }
-    return llm.invoke(full_prompt.format(**inputs))
+    return hits[0][0], hits[0][2]
+
+# Replies to recurring short utterances are reused across the campaign (see reply_cache.py)
+reply_cache = ReplyCache(lambda text: startup.get("vectorstore").embeddings.embed_query(text))
+
+def llm_stage_reply(client_info, chat_history, new_offer_details, faq_context="None", state=None):
+    inputs = prompt_inputs(client_info, new_offer_details, faq_context)
+    inputs["chat_history"] = chat_history
+    if state is None:
+        return startup.get("llm").invoke(full_prompt.format(**inputs))
+
+    inputs["stage_instructions"] = state.prompt_section()
+    prompt = stage_prompt.format(**inputs)
+    state.record_prompt(prompt)
+    return state.observe_reply(startup.get("llm").invoke(prompt))
 
 # --- Audio setup ---
 logger.remove(0)
 logger.add(sys.stderr, level="INFO")
 
-# Initialize STT model (faster-whisper)
-print("Loading STT model...")
-stt_model = WhisperModel("base", device="cpu", compute_type="int8")
-print("STT model loaded!")
+def load_audio_workers():
+    # The workers load and warm their own STT/TTS models
+    from audio_workers import AudioWorkers
+    return AudioWorkers().start()
 
-# Initialize TTS model (kokoro)
-print("Loading TTS model...")
-tts_pipeline = kokoro.Pipeline(lang_code='a')  # 'a' for American English
-print("TTS model loaded!")
+if USE_WORKERS:
+    startup.add("audio_workers", load_audio_workers)
 
 # Audio recording settings
 SAMPLE_RATE = 16000
 CHANNELS = 1
-SILENCE_THRESHOLD = 0.01  # Adjust based on your microphone
 SILENCE_DURATION = 1.5  # seconds of silence to stop recording
 
 class AudioRecorder:
@@ -121,6 +100,7 @@ class AudioRecorder:
         self.is_recording = True
         silence_frames = 0
         max_silence_frames = int(SILENCE_DURATION * SAMPLE_RATE / 1024)
+        vad = startup.get("vad")
         
         with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, 
                            callback=self.callback, blocksize=1024):
@@ -132,7 +112,7 @@ class AudioRecorder:
                     self.frames.append(data)
                     
                     # Check for silence
-                    if np.max(np.abs(data)) < SILENCE_THRESHOLD:
+                    if not vad.is_speech(data[:, 0]):
                         silence_frames += 1
                         if silence_frames > max_silence_frames:
                             logger.info("Silence detected, processing...")
@@ -153,52 +133,99 @@ class AudioRecorder:
         return audio_data
 
 def transcribe_audio(audio_data):
-    """Transcribe audio using faster-whisper"""
+    """Transcribe audio with the selected STT backend"""
     if audio_data is None or len(audio_data) == 0:
         return ""
     
-    # Save to temporary WAV file
-    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp_file:
-        tmp_path = tmp_file.name
-        wavfile.write(tmp_path, SAMPLE_RATE, (audio_data * 32767).astype(np.int16))
-    
-    try:
-        segments, info = stt_model.transcribe(tmp_path, language="en", beam_size=5)
-        transcript = " ".join([segment.text for segment in segments])
-        return transcript.strip()
-    finally:
-        os.unlink(tmp_path)
+    # faster-whisper takes the float32 16 kHz samples directly, no temp WAV needed
+    return startup.get("stt").transcribe(audio_data[:, 0] if audio_data.ndim > 1 else audio_data)
 
 def speak_text(text):
     """Convert text to speech and play it"""
     logger.info(f"🔊 Speaking: {text}")
     
-    # Generate audio using kokoro
-    audio_data, sample_rate = tts_pipeline(text)
+    audio_data, sample_rate = startup.get("tts").synthesize(text)
     
     # Play audio
     sd.play(audio_data, sample_rate)
     sd.wait()  # Wait until audio finishes playing
 
+# --- Pre-dial preparation ---
+def prepare_client(client_meta, new_offer_details):
+    """Builds everything the first seconds of a call need, ahead of dialing."""
+    if not client_meta:
+        return None
+
+    client_info = {
+        "Name": client_meta.get("Name", "Unknown"),
+        "LastService": client_meta.get("LastService", "Unknown"),
+        "PurchaseDate": client_meta.get("PurchaseDate", "Unknown"),
+    }
+    greeting = f"Hello, this is Canvi from Canvas Digital. May I speak with {client_info['Name']}?"
+
+    faq_docs = startup.get("vectorstore").similarity_search(
+        f"{client_info['LastService']} {new_offer_details}", k=2, filter={"Type": "FAQ"})
+    faq_context = "\n".join(doc.page_content.strip() for doc in faq_docs)
+
+    # In worker mode kokoro lives in the TTS process, so the greeting is synthesized there
+    greeting_audio = None if USE_WORKERS else startup.get("tts").synthesize(greeting)
+
+    prefix = prompt_prefix(stage_prompt, prompt_inputs(client_info, new_offer_details, faq_context))
+    return PreparedCall(client_info, greeting, greeting_audio, prefix, faq_context)
+
+def prime_prompt_prefix(prefix):
+    """Has every Ollama replica evaluate the per-client prompt prefix so the first turn reuses its KV cache."""
+    for result in startup.get("llm").broadcast(prefix, num_predict=1):
+        if isinstance(result, Exception):
+            logger.warning(f"Prompt prefix priming failed: {result}")
+
 # --- Main conversation loop ---
-def run_conversation(client_info, new_offer_details):
+def run_conversation(client_info, new_offer_details, prepared=None, io=None):
     conversation_history = ""
-    recorder = AudioRecorder()
-    
-    # Start with introduction
-    intro = f"Hello, this is Canvi from Canvas Digital. May I speak with {client_info['Name']}?"
-    speak_text(intro)
-    conversation_history += f"Canvi: {intro}\n"
-    
-    print("\n📞 Call started. Press Ctrl+C to end.\n")
+    said = set()  # agent lines so far, so the reply cache doesn't repeat one
+    faq_context = prepared.faq_context if prepared else "None"
+    state = ConversationState(call_id=client_info["Name"])
+    call = startup.get("call_log").open_call(client_info, new_offer_details,
+                                             source="network" if io is not None else "local")
+    outcome = "error"
+
+    if io is not None:
+        # Network call: io is a media_gateway.CallSession
+        listen = io.listen
+        say = io.speak
+    elif USE_WORKERS:
+        workers = startup.get("audio_workers")
+        listen = workers.listen
+        say = workers.speak
+    else:
+        recorder = AudioRecorder()
+        listen = lambda: transcribe_audio(recorder.record_until_silence())
+        say = speak_text
     
     try:
+        # Start with introduction (a network caller can hang up during it)
+        if prepared and prepared.greeting_audio is not None:
+            intro = prepared.greeting
+            logger.info(f"🔊 Speaking (pre-rendered): {intro}")
+            if io is not None:
+                io.play(*prepared.greeting_audio)
+            else:
+                sd.play(*prepared.greeting_audio)
+                sd.wait()
+        else:
+            intro = f"Hello, this is Canvi from Canvas Digital. May I speak with {client_info['Name']}?"
+            say(intro)
+        conversation_history += f"Canvi: {intro}\n"
+        said.add(intro)
+        
+        print("\n📞 Call started. Press Ctrl+C to end.\n")
+        
         while True:
-            # Record user speech
-            audio_data = recorder.record_until_silence()
-            
-            # Transcribe
-            transcript = transcribe_audio(audio_data)
+            # Record and transcribe user speech
+            started = time.perf_counter()
+            transcript = listen()
+            timings = {"listen": time.perf_counter() - started}
+            from_cache = False
             
             if not transcript:
                 response_text = "I didn't catch that. Could you please repeat?"
@@ -206,27 +233,42 @@ def run_conversation(client_info, new_offer_details):
             else:
                 logger.info(f"Client said: {transcript}")
                 conversation_history += f"Client: {transcript}\n"
+                state.observe_client(transcript)
                 
                 # Check for goodbye
                 if "GOODBYE_CALL" in conversation_history or \
                    any(word in transcript.lower() for word in ["goodbye", "bye", "hang up", "end call"]):
                     response_text = "Thank you for your time. Have a great day!"
-                    speak_text(response_text)
+                    say(response_text)
+                    call.turn(transcript, response_text, state.stage, timings)
+                    outcome = "client_goodbye"
                     break
                 
-                # Generate response
+                # Generate response, or reuse one for a common short utterance
                 try:
-                    response = llm_stage_reply(client_info, conversation_history, new_offer_details)
-                    response_text = response.strip()
-                    if response_text.startswith("Canvi:"):
-                        response_text = response_text[6:].strip()
+                    stage = state.stage
+                    started = time.perf_counter()
+                    cached = reply_cache.lookup(stage, new_offer_details, transcript, client_info, exclude=said)
+                    if cached:
+                        response_text = cached
+                        from_cache = True
+                    else:
+                        response = llm_stage_reply(client_info, conversation_history, new_offer_details, faq_context, state)
+                        response_text = response.strip()
+                        if response_text.startswith("Canvi:"):
+                            response_text = response_text[6:].strip()
+                        reply_cache.store(stage, new_offer_details, transcript, response_text, client_info)
+                    timings["reply"] = time.perf_counter() - started
                     
                     conversation_history += f"Canvi: {response_text}\n"
+                    said.add(response_text)
                     
                     # Check if agent wants to end call
                     if "GOODBYE_CALL" in response_text:
                         response_text = response_text.replace("GOODBYE_CALL", "").strip()
-                        speak_text(response_text)
+                        say(response_text)
+                        call.turn(transcript, response_text, state.stage, timings, cached=from_cache)
+                        outcome = "agent_goodbye"
                         break
                         
                 except Exception as e:
@@ -234,39 +276,174 @@ def run_conversation(client_info, new_offer_details):
                     response_text = "Sorry, I had a technical issue. Could we try that again?"
             
             # Speak response
-            speak_text(response_text)
+            started = time.perf_counter()
+            say(response_text)
+            timings["speak"] = time.perf_counter() - started
+            call.turn(transcript, response_text, state.stage, timings, cached=from_cache)
             
     except KeyboardInterrupt:
         print("\n\n📞 Call ended by user.")
+        outcome = "operator_ended"
+    except CallEnded:
+        print("\n\n📞 Caller hung up.")
+        outcome = "hung_up"
     except Exception as e:
         logger.exception("Error during call")
+    finally:
+        call.end(outcome, state.stage, stage_summary=state.summary())
     
     print("\n" + "="*50)
     print("CONVERSATION SUMMARY")
     print("="*50)
     print(conversation_history)
     print("="*50)
+    logger.info(f"Stage summary: {state.summary()}")
+
+def resolve_dial_list(names):
+    """Resolves the whole list up front; returns (record id, record) pairs in dial order."""
+    result = startup.get("client_resolver").resolve(names)
+    for query, candidates in result["ambiguous"].items():
+        options = ", ".join(f"{c['name']} ({c['score']:.2f})" for c in candidates)
+        print(f"❓ {query}: ambiguous between {options}, skipping.")
+    for query in result["missing"]:
+        print(f"❌ {query}: client not found in records, skipping.")
+    logger.info(f"Dial list resolved: {result['stats']}")
+
+    records, seen = [], set()
+    for name in names:
+        match = result["matched"].get(name)
+        if match and match["id"] not in seen:
+            seen.add(match["id"])
+            records.append((match["id"], match["record"]))
+    return records
+
+def run_campaign(names, new_offer_details, lookahead=3, records=None):
+    """Calls each client in turn while the next ones are prepared in the background.
+
+    records: (record id, record) pairs the operator already confirmed (e.g.
+    the one find_client() showed); otherwise the names are resolved here.
+    Everything is keyed by record id, so two clients sharing a name are
+    both called.
+    """
+    if records is None:
+        records = resolve_dial_list(names)
+    records = dict(records)
+    cache = PreDialCache(lambda record_id: prepare_client(records[record_id], new_offer_details), lookahead=lookahead)
+    cache.set_queue(list(records))
+    try:
+        for record_id, record in records.items():
+            prepared = cache.take(record_id)
+            if prepared is None:
+                print(f"❌ {record.get('Name', record_id)}: couldn't prepare the call, skipping.")
+                continue
+            # Evaluate the prompt prefix while the greeting plays
+            threading.Thread(target=prime_prompt_prefix, args=(prepared.prompt_prefix,), daemon=True).start()
+            print(f"\n📞 Calling {prepared.client_info['Name']}...")
+            run_conversation(prepared.client_info, new_offer_details, prepared)
+    finally:
+        cache.close()
+        logger.info(f"Pre-dial cache: {cache.stats()}")
+        logger.info(f"Reply cache: {reply_cache.stats()}")
+        logger.info(f"Call log: {startup.get('call_log').stats()}")
+
+def start_network_call(meta, session):
+    """Runs one network call through the normal turn loop."""
+    offer = meta.get("offer", "")
+    client = (meta.get("client") or "").strip()
+    # Same thresholds as a dial list: a caller is never connected to a near or ambiguous match
+    result = startup.get("client_resolver").resolve([client]) if client else {"matched": {}}
+    match = result["matched"].get(client)
+    if match is None:
+        if client in result.get("ambiguous", {}):
+            logger.warning(f"Network call for {client!r} rejected: ambiguous client match")
+        else:
+            logger.warning(f"Network call for {client!r} rejected: client not found")
+        session.speak("Sorry, I couldn't find your account details. Goodbye!")
+        return
+    prepared = prepare_client(match["record"], offer)
+    threading.Thread(target=prime_prompt_prefix, args=(prepared.prompt_prefix,), daemon=True).start()
+    run_conversation(prepared.client_info, offer, prepared, io=session)
+
+def serve_calls():
+    """Accepts calls on the media gateway (WebSocket /media and WebRTC) until interrupted."""
+    from media_gateway import MediaGateway
+
+    startup.start()
+    startup.wait_all()
+    startup.report()
+
+    gateway = MediaGateway(
+        start_call=start_network_call,
+        transcribe=transcribe_audio,
+        synthesize=lambda text: startup.get("tts").synthesize(text),
+        max_calls=int(os.environ.get("CANVI_MAX_CALLS", "32")),
+    )
+    host = os.environ.get("CANVI_HOST", "127.0.0.1")
+    port = int(os.environ.get("CANVI_PORT", "8765"))
+    print(f"\n📡 Media gateway listening on ws://{host}:{port}/media")
+    try:
+        gateway.serve(host=host, port=port, default_meta={
+            "client": os.environ.get("CANVI_CLIENT", ""),
+            "offer": os.environ.get("CANVI_OFFER", ""),
+        })
+    finally:
+        logger.info(f"Stream stats: {gateway.stats()}")
+        logger.info(f"Reply cache: {reply_cache.stats()}")
+        logger.info(f"Call log: {startup.get('call_log').stats()}")
+        startup.get("llm").close()
 
 def main():
     print("Canvas Digital Sales Agent (Local Version)")
     print("=" * 50)
+    if SERVE:
+        serve_calls()
+        return
+    startup.start()
     
-    query = input("Enter client name: ")
-    client_meta = find_client(query)
+    query = input("Enter client name (comma-separated for a campaign, @file for a dial list): ").strip()
+    if query.startswith("@"):
+        try:
+            names = read_names(query[1:])
+        except OSError as e:
+            print(f"❌ Can't read dial list {query[1:]!r}: {e.strerror or e}. Check the path after @.")
+            return
+        except ValueError as e:
+            print(f"❌ {e}. Use one name per line, or a CSV whose first row names the columns.")
+            return
+    else:
+        names = [name.strip() for name in query.split(",") if name.strip()]
     
-    if not client_meta:
-        print("❌ Client not found in records. Please try another name.")
+    records = None
+    if len(names) == 1:
+        found = find_client(names[0])
+        
+        if not found:
+            print("❌ Client not found in records. Please try another name.")
+            return
+        record_id, client_meta = found
+        
+        print(f"\n✅ Client found: {client_meta['Name']}")
+        print(f"   Last Service: {client_meta['LastService']}")
+        print(f"   Purchase Date: {client_meta['PurchaseDate']}")
+        # Call the client shown above; the resolver's thresholds could skip a near match
+        records = [(record_id, client_meta)]
+    elif not names:
+        print("❌ No client name entered.")
         return
     
-    print(f"\n✅ Client found: {client_meta['Name']}")
-    print(f"   Last Service: {client_meta['LastService']}")
-    print(f"   Purchase Date: {client_meta['PurchaseDate']}")
-    
     new_offer_details = input("\nEnter new opportunity details: ")
     
+    startup.wait_all()
+    startup.report()
+
     print("\n🎙️  Starting voice call...\n")
     
-    run_conversation(client_meta, new_offer_details)
+    try:
+        run_campaign(names, new_offer_details, records=records)
+    finally:
+        if USE_WORKERS:
+            startup.get("audio_workers").stop()
+        startup.get("llm").close()
     
     print("\nThank you for using Canvas Digital Sales Agent.")
 
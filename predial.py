@@ -0,0 +1,109 @@
+"""Pre-dial preparation cache for campaign calls.
+
+While one call is running, the next few clients in the dial queue are
+prepared in the background: client record lookup, greeting text and audio,
+the per-client prompt prefix and the FAQ passages relevant to them. When a
+client picks up, everything needed for the first words is already there.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+_HISTORY_MARKER = "\x00CHAT_HISTORY\x00"
+
+
+class PreparedCall:
+    def __init__(self, client_info, greeting, greeting_audio=None, prompt_prefix="", faq_context=""):
+        self.client_info = client_info
+        self.greeting = greeting
+        self.greeting_audio = greeting_audio
+        self.prompt_prefix = prompt_prefix
+        self.faq_context = faq_context
+        self.prepared_at = time.time()
+
+
+def prompt_prefix(prompt, inputs):
+    """Renders the part of `prompt` that comes before the chat history.
+
+    That text is identical on every turn of the call, so evaluating it once
+    ahead of time lets the LLM server reuse its KV cache for the real turns.
+    """
+    rendered = prompt.format(**dict(inputs, chat_history=_HISTORY_MARKER))
+    return rendered.split(_HISTORY_MARKER)[0]
+
+
+class PreDialCache:
+    """Bounded LRU of in-flight/finished preparations keyed by client record id.
+
+    prepare(key) is whatever the script uses to build a PreparedCall (or None
+    if the client can't be found). Only the next `lookahead` clients of the
+    queue are prepared; the oldest entries are evicted past `max_entries`.
+    A preparation that raises is reported and treated like a missing client
+    so one bad record doesn't stop the campaign.
+    """
+
+    def __init__(self, prepare, lookahead=3, max_entries=8, workers=2):
+        self.prepare = prepare
+        self.lookahead = lookahead
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.queue = []
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predial")
+        self.hits = 0
+        self.waits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def set_queue(self, keys):
+        """Sets the dial order and starts preparing the first clients."""
+        self.queue = list(keys)
+        self._fill(0)
+
+    def _fill(self, position):
+        for key in self.queue[position:position + self.lookahead]:
+            self._submit(key)
+
+    def _submit(self, key):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return
+            self.entries[key] = self.pool.submit(self.prepare, key)
+            while len(self.entries) > self.max_entries:
+                _, future = self.entries.popitem(last=False)
+                future.cancel()
+                self.evictions += 1
+
+    def take(self, key):
+        """Returns the prepared call for `key` and starts on the clients after it."""
+        with self._lock:
+            future = self.entries.pop(key, None)
+
+        try:
+            if future is None or future.cancelled():
+                self.misses += 1
+                prepared = self.prepare(key)
+            else:
+                if future.done():
+                    self.hits += 1
+                else:
+                    self.waits += 1
+                prepared = future.result()
+        except Exception as e:
+            self.failures += 1
+            print(f"Pre-dial preparation failed for {key!r}, skipping: {type(e).__name__}: {e}")
+            prepared = None
+
+        if key in self.queue:
+            self._fill(self.queue.index(key) + 1)
+        return prepared
+
+    def stats(self):
+        return {"hits": self.hits, "waits": self.waits, "misses": self.misses,
+                "evictions": self.evictions, "failures": self.failures, "cached": len(self.entries)}
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
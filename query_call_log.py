@@ -0,0 +1,142 @@
+"""Query the call log written by call_log.CallLog.
+
+    python query_call_log.py stats                       # whole campaign
+    python query_call_log.py stats --since 2026-10-01 --until 2026-10-07
+    python query_call_log.py calls --client "Sarah"      # one line per call
+    python query_call_log.py events --client "Sarah" --type turn --limit 20
+
+Filters on client and date use the index, so only matching batches are
+decompressed. stats streams through the events and keeps only counters
+and fixed-size latency histograms (percentiles to within ~2.3%), so its
+memory doesn't grow with the number of turns.
+"""
+import argparse
+import json
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from call_log import LOG_ROOT, day_of, scan
+
+
+def cmd_events(args):
+    for i, event in enumerate(scan(args.root, args.client, args.since, args.until, args.type)):
+        if args.limit and i >= args.limit:
+            break
+        print(json.dumps(event, ensure_ascii=False))
+
+
+def cmd_calls(args):
+    calls = {}
+    for event in scan(args.root, args.client, args.since, args.until):
+        call = calls.setdefault(event["call_id"], {"client": event["client"], "started": None,
+                                                   "turns": 0, "outcome": "open", "stage": None})
+        if event["type"] == "call_start":
+            call["started"] = event["ts"]
+        elif event["type"] == "turn":
+            call["turns"] += 1
+            call["stage"] = event.get("stage")
+        elif event["type"] == "call_end":
+            call["outcome"] = event["outcome"]
+            call["stage"] = event.get("stage") or call["stage"]
+
+    print(f"{'call_id':<14}{'client':<24}{'turns':>6}  {'stage':<13}{'outcome'}")
+    for call_id, call in sorted(calls.items(), key=lambda item: item[1]["started"] or 0):
+        print(f"{call_id:<14}{call['client'][:23]:<24}{call['turns']:>6}  {call['stage'] or '-':<13}{call['outcome']}")
+
+
+def cmd_stats(args):
+    events = Counter()
+    outcomes = Counter()
+    final_stages = Counter()
+    turns_by_stage = Counter()
+    calls_by_day = Counter()
+    clients = set()
+    cached = 0
+    timings = defaultdict(Histogram)
+    durations = Histogram()
+
+    for event in scan(args.root, args.client, args.since, args.until):
+        events[event["type"]] += 1
+        clients.add(event["client"])
+        if event["type"] == "call_start":
+            calls_by_day[day_of(event["ts"])] += 1
+        elif event["type"] == "turn":
+            turns_by_stage[event.get("stage") or "-"] += 1
+            cached += bool(event.get("cached"))
+            for step, seconds in (event.get("timings") or {}).items():
+                timings[step].add(seconds)
+        elif event["type"] == "call_end":
+            outcomes[event["outcome"]] += 1
+            final_stages[event.get("stage") or "-"] += 1
+            durations.add(event.get("duration", 0.0))
+
+    turns = events["turn"]
+    report = {
+        "calls": events["call_start"],
+        "clients": len(clients),
+        "turns": turns,
+        "turns_per_call": round(turns / events["call_start"], 2) if events["call_start"] else 0.0,
+        "cached_reply_rate": round(cached / turns, 3) if turns else 0.0,
+        "outcomes": dict(outcomes.most_common()),
+        "final_stage": dict(final_stages.most_common()),
+        "turns_by_stage": dict(turns_by_stage.most_common()),
+        "call_duration_s": durations.summary(),
+        "timings_s": {step: histogram.summary() for step, histogram in sorted(timings.items())},
+        "calls_by_day": dict(sorted(calls_by_day.items())),
+    }
+    print(json.dumps(report, indent=2))
+
+
+class Histogram:
+    """Streaming count/sum plus log-spaced buckets from 1 ms to ~28 h for percentiles."""
+
+    BUCKETS_PER_DECADE = 100
+    LOW = 1e-3
+    SIZE = 8 * BUCKETS_PER_DECADE
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.buckets = np.zeros(self.SIZE + 1, dtype=np.int64)   # bucket 0: below LOW
+
+    def add(self, value):
+        value = float(value)
+        self.count += 1
+        self.total += value
+        if value < self.LOW:
+            self.buckets[0] += 1
+            return
+        bucket = int(np.log10(value / self.LOW) * self.BUCKETS_PER_DECADE) + 1
+        self.buckets[min(bucket, self.SIZE)] += 1
+
+    def percentile(self, p):
+        bucket = int(np.searchsorted(np.cumsum(self.buckets), p / 100 * self.count))
+        if bucket == 0:
+            return 0.0
+        # Geometric middle of the bucket
+        return self.LOW * 10 ** ((bucket - 0.5) / self.BUCKETS_PER_DECADE)
+
+    def summary(self):
+        if not self.count:
+            return None
+        return {"mean": round(self.total / self.count, 3),
+                "p50": round(self.percentile(50), 3),
+                "p95": round(self.percentile(95), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "calls", "events"])
+    parser.add_argument("--root", default=LOG_ROOT, help="call log directory")
+    parser.add_argument("--client", help="client name (case-insensitive substring)")
+    parser.add_argument("--since", help="first date, YYYY-MM-DD")
+    parser.add_argument("--until", help="last date, YYYY-MM-DD")
+    parser.add_argument("--type", choices=["call_start", "turn", "call_end"], help="events: only this type")
+    parser.add_argument("--limit", type=int, default=0, help="events: stop after this many")
+    args = parser.parse_args()
+    {"stats": cmd_stats, "calls": cmd_calls, "events": cmd_events}[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""Semantic cache of agent replies to common short client utterances.
+
+Across a campaign clients keep saying the same few things ("I'm busy",
+"who is this?", "send me an email"). Replies are cached per (stage, offer)
+and matched on the embedding of the normalized utterance, so a close
+paraphrase is answered without an LLM generation. Client name, service and
+purchase date are stored as slots and filled in for the current client on a
+hit; a reply that would still carry another client's data is not cached.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+SIMILARITY_THRESHOLD = 0.92
+TTL_SECONDS = 6 * 3600
+MAX_ENTRIES = 500
+MAX_WORDS = 8          # longer utterances are too specific to reuse a reply for
+EMBEDDING_MEMO = 64
+
+_NON_WORD = re.compile(r"[^\w\s']")
+_SPACES = re.compile(r"\s+")
+_PLACEHOLDERS = {"", "Unknown"}   # defaults from the client lookup, not client data
+
+
+def normalize(text):
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text.lower())).strip()
+
+
+def _slots(client_info):
+    name = str(client_info.get("Name", ""))
+    return [
+        ("{client_name}", name),
+        ("{first_name}", name.split(" ")[0] if name else ""),
+        ("{service}", str(client_info.get("LastService", ""))),
+        ("{purchase_date}", str(client_info.get("PurchaseDate", ""))),
+    ]
+
+
+def _word_pattern(value, flags=0):
+    # Lookarounds rather than \b so values ending in punctuation still match
+    return re.compile(r"(?<!\w)" + re.escape(value) + r"(?!\w)", flags)
+
+
+def to_template(reply, client_info):
+    # Full name before first name so "Sarah Johnson" doesn't become "{first_name} Johnson";
+    # whole words only so "Al" doesn't turn "Also" into "{first_name}so"
+    for slot, value in _slots(client_info):
+        if value not in _PLACEHOLDERS:
+            reply = _word_pattern(value).sub(slot, reply)
+    return reply
+
+
+def leaks_client_data(template, client_info):
+    """True if the template still contains one of the client's values (or a part of their name)."""
+    values = {str(v) for v in client_info.values() if v is not None}
+    values.update(str(client_info.get("Name", "")).split())
+    return any(_word_pattern(value, re.IGNORECASE).search(template)
+               for value in values if value not in _PLACEHOLDERS and len(value) > 1)
+
+
+def fill_template(template, client_info):
+    for slot, value in _slots(client_info):
+        template = template.replace(slot, value)
+    return template
+
+
+class ReplyCache:
+    def __init__(self, embed, threshold=SIMILARITY_THRESHOLD, ttl=TTL_SECONDS,
+                 max_entries=MAX_ENTRIES, max_words=MAX_WORDS):
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_words = max_words
+        # (stage, offer, normalized utterance) -> {"vector", "template", "created"}
+        self.entries = OrderedDict()
+        self._vectors = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.unsafe = 0
+        self.evictions = 0
+        # Network calls share one cache across conversation threads
+        self._lock = threading.Lock()
+
+    def _vector(self, norm):
+        with self._lock:
+            vector = self._vectors.get(norm)
+        if vector is None:
+            # Embedding is an HTTP round-trip, so it runs outside the lock
+            vector = np.asarray(self.embed(norm), dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+            with self._lock:
+                self._vectors[norm] = vector
+                if len(self._vectors) > EMBEDDING_MEMO:
+                    self._vectors.popitem(last=False)
+        return vector
+
+    def _cacheable(self, norm):
+        return bool(norm) and len(norm.split()) <= self.max_words
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        for key in [k for k, e in self.entries.items() if e["created"] < cutoff]:
+            del self.entries[key]
+            self.evictions += 1
+
+    def lookup(self, stage, offer, utterance, client_info, exclude=()):
+        """Returns a cached reply filled in for this client, or None.
+
+        exclude: replies already said on this call. A match that fills in to
+        one of them counts as a miss and doesn't refresh the entry, since the
+        caller has to generate a fresh reply anyway.
+        """
+        norm = normalize(utterance)
+        if not self._cacheable(norm):
+            self.skipped += 1
+            return None
+        key = (stage, offer, norm)
+        with self._lock:
+            self._expire()
+            exact = key in self.entries
+            if not exact:
+                candidates = [(k, e["vector"]) for k, e in self.entries.items() if k[0] == stage and k[1] == offer]
+
+        if not exact:
+            key = None
+            if candidates:
+                scores = np.stack([v for _, v in candidates]) @ self._vector(norm)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key = candidates[best][0]
+
+        with self._lock:
+            entry = self.entries.get(key) if key is not None else None
+            reply = fill_template(entry["template"], client_info) if entry is not None else None
+            if reply is None or reply in exclude:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+        return reply
+
+    def store(self, stage, offer, utterance, reply, client_info):
+        norm = normalize(utterance)
+        if not self._cacheable(norm) or not reply:
+            return
+        template = to_template(reply, client_info)
+        if leaks_client_data(template, client_info):
+            # e.g. "Ms. Johnson" or a case change the slots can't capture; reusing it would leak
+            self.unsafe += 1
+            return
+        entry = {
+            "vector": self._vector(norm),
+            "template": template,
+            "created": time.time(),
+        }
+        with self._lock:
+            self.entries[(stage, offer, norm)] = entry
+            self.entries.move_to_end((stage, offer, norm))
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "skipped": self.skipped,
+                "unsafe": self.unsafe,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self.entries), "evictions": self.evictions}
@@ -0,0 +1,155 @@
+"""Background model loading for the agent scripts.
+
+Each component (vector store, LLM, STT, TTS...) is registered with a loader
+and an optional warmup. start() runs them all concurrently in threads so the
+models load while the operator is still typing the client name; get() blocks
+only if a component the call needs isn't ready yet. The warmup does a dummy
+inference so the first real turn doesn't pay JIT/page-in costs.
+
+add_agent_components() registers the components all the agent scripts
+share, with their loaders and warmups.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class StartupManager:
+    def __init__(self):
+        self.components = {}
+        self.futures = {}
+        self.timings = {}
+        self.started_at = None
+        self._lock = threading.Lock()
+
+    def add(self, name, loader, warmup=None):
+        """Registers a component. warmup(obj) runs right after loader()."""
+        self.components[name] = (loader, warmup)
+
+    def _load(self, name):
+        loader, warmup = self.components[name]
+        t0 = time.perf_counter()
+        obj = loader()
+        t1 = time.perf_counter()
+        warmup_error = None
+        if warmup is not None:
+            # A failed warmup only costs the first real call its latency; the component is still usable
+            try:
+                warmup(obj)
+            except Exception as e:
+                warmup_error = f"{type(e).__name__}: {e}"
+                print(f"{name} warmup failed (component still loaded): {warmup_error}")
+        t2 = time.perf_counter()
+        with self._lock:
+            self.timings[name] = {"load": t1 - t0, "warmup": t2 - t1,
+                                  "ready_at": t2 - self.started_at, "waited": 0.0,
+                                  "warmup_error": warmup_error}
+        return obj
+
+    def start(self):
+        """Kicks off every registered loader in the background."""
+        if self.started_at is not None:
+            return self
+        self.started_at = time.perf_counter()
+        pool = ThreadPoolExecutor(max_workers=len(self.components) or 1, thread_name_prefix="startup")
+        for name in self.components:
+            self.futures[name] = pool.submit(self._load, name)
+        pool.shutdown(wait=False)
+        return self
+
+    def get(self, name):
+        """Returns the loaded component, waiting for it if needed.
+
+        Re-raises the loader's exception if it failed.
+        """
+        self.start()
+        future = self.futures[name]
+        if not future.done():
+            t0 = time.perf_counter()
+            print(f"Waiting for {name} to finish loading...")
+            obj = future.result()
+            self.timings[name]["waited"] = time.perf_counter() - t0
+            return obj
+        return future.result()
+
+    def wait_all(self):
+        for name in self.futures:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"{name} failed to load: {e}")
+
+    def report(self):
+        """Prints the per-component startup timing breakdown."""
+        print("Startup timing (seconds):")
+        print(f"  {'component':<14}{'load':>8}{'warmup':>8}{'ready at':>10}{'waited':>8}")
+        for name in self.components:
+            t = self.timings.get(name)
+            if t is None:
+                state = "failed" if name in self.futures and self.futures[name].done() else "pending"
+                print(f"  {name:<14}{state:>8}")
+                continue
+            note = "  (warmup failed)" if t.get("warmup_error") else ""
+            print(f"  {name:<14}{t['load']:>8.2f}{t['warmup']:>8.2f}{t['ready_at']:>10.2f}{t['waited']:>8.2f}{note}")
+
+
+# --- Components shared by the agent scripts ---
+
+DB_PATH = "chroma_db"
+
+
+def load_vectorstore(db_path=DB_PATH):
+    from langchain_chroma import Chroma
+    from langchain_ollama import OllamaEmbeddings
+    return Chroma(persist_directory=db_path, embedding_function=OllamaEmbeddings(model="mxbai-embed-large"))
+
+
+def load_player():
+    # In-memory PCM on a persistent output stream (see audio_playback.py)
+    from audio_playback import PCMPlayer
+    return PCMPlayer()
+
+
+def warm_vectorstore(vectorstore):
+    # Loads the embedding model into Ollama and pages in the index
+    vectorstore.similarity_search("warmup", k=1, filter={"Type": "Client"})
+
+
+def warm_llm(llm):
+    # Forces Ollama to load the model into memory before the first turn
+    from llm_gateway import WARMUP_DEADLINE
+    llm.invoke("Reply with OK.", deadline=WARMUP_DEADLINE)
+
+
+def warm_stt(stt):
+    import numpy as np
+    stt.transcribe(np.zeros(16000, dtype=np.float32))
+
+
+def warm_tts(tts):
+    # Synthesized but never played
+    tts.synthesize("Hello.")
+
+
+WARMUPS = {"llm": warm_llm, "stt": warm_stt, "tts": warm_tts}
+
+
+def add_agent_components(startup, kinds=("stt", "tts", "llm"), db_path=DB_PATH):
+    """Registers what every agent script needs: the vector store, the call log
+    (see call_log.py) and the calibrated backend of each kind (see backends.py).
+
+    The llm component is the LLMGateway itself (see llm_gateway.py).
+    """
+    from backends import BackendSelector
+    from call_log import CallLog
+
+    startup.add("vectorstore", lambda: load_vectorstore(db_path), warm_vectorstore)
+    startup.add("call_log", CallLog)
+    startup.add("backends", lambda: BackendSelector(kinds=kinds).select())
+    for kind in kinds:
+        if kind == "llm":
+            loader = lambda: startup.get("backends").load("llm").gateway
+        else:
+            loader = lambda kind=kind: startup.get("backends").load(kind)
+        startup.add(kind, loader, WARMUPS.get(kind))
+    return startup
@@ -0,0 +1,121 @@
+"""Adaptive STT model tiering for faster-whisper.
+
+Keeps several Whisper models warm and routes each utterance by its length
+and each model's measured real-time factor (RTF = decode time / audio time).
+Short replies like "yes" go to the fast tier; if that decode looks unsure
+(low avg logprob or high no-speech probability) the utterance is re-decoded
+with the next larger tier.
+"""
+import time
+
+import numpy as np
+from loguru import logger
+
+SAMPLE_RATE = 16000
+
+# Ordered fastest -> most accurate
+DEFAULT_TIERS = ("tiny.en", "base")
+
+SHORT_UTTERANCE_SECONDS = 2.0   # always try the fast tier below this
+LATENCY_BUDGET_SECONDS = 1.0    # largest tier whose expected decode time fits wins
+MIN_AVG_LOGPROB = -0.8          # below this the fast decode is re-done
+MAX_NO_SPEECH_PROB = 0.6
+RTF_SMOOTHING = 0.3             # EMA weight of the newest RTF sample
+
+
+class STTTier:
+    def __init__(self, name, model, beam_size):
+        self.name = name
+        self.model = model
+        self.beam_size = beam_size
+        self.rtf = None
+        self.calls = 0
+
+    def transcribe(self, audio):
+        start = time.perf_counter()
+        segments, info = self.model.transcribe(audio, language="en", beam_size=self.beam_size)
+        segments = list(segments)  # decoding is lazy until the generator is consumed
+        elapsed = time.perf_counter() - start
+
+        duration = max(len(audio) / SAMPLE_RATE, 1e-3)
+        rtf = elapsed / duration
+        self.rtf = rtf if self.rtf is None else (1 - RTF_SMOOTHING) * self.rtf + RTF_SMOOTHING * rtf
+        self.calls += 1
+
+        text = " ".join(segment.text for segment in segments).strip()
+        if segments:
+            avg_logprob = float(np.mean([s.avg_logprob for s in segments]))
+            no_speech_prob = float(max(s.no_speech_prob for s in segments))
+        else:
+            avg_logprob, no_speech_prob = 0.0, 1.0
+        return {
+            "text": text,
+            "tier": self.name,
+            "avg_logprob": avg_logprob,
+            "no_speech_prob": no_speech_prob,
+            "seconds": elapsed,
+        }
+
+
+class STTTierManager:
+    """Warm pool of faster-whisper models with length/RTF routing and fallback."""
+
+    def __init__(self, tiers=DEFAULT_TIERS, device="cpu", compute_type="int8"):
+        from faster_whisper import WhisperModel
+
+        self.tiers = []
+        for i, name in enumerate(tiers):
+            logger.info(f"Loading STT tier {name}...")
+            model = WhisperModel(name, device=device, compute_type=compute_type)
+            # Greedy decoding on the fast tier; the accurate tier keeps beam search
+            self.tiers.append(STTTier(name, model, beam_size=1 if i < len(tiers) - 1 else 5))
+        self.redecodes = 0
+        self.warmup()
+
+    def warmup(self):
+        """Runs dummy decodes on every tier so the first real turn is not cold."""
+        noise = (np.random.default_rng(0).standard_normal(SAMPLE_RATE) * 1e-3).astype(np.float32)
+        for tier in self.tiers:
+            tier.transcribe(noise)
+            # The first decode pays page-in costs; measure RTF on the second
+            tier.rtf = None
+            tier.transcribe(noise)
+            tier.calls = 0
+            logger.info(f"STT tier {tier.name} warm (RTF {tier.rtf:.2f})")
+
+    def pick_tier(self, duration):
+        """Index of the tier to try first for an utterance of `duration` seconds."""
+        if duration <= SHORT_UTTERANCE_SECONDS:
+            return 0
+        for i in range(len(self.tiers) - 1, -1, -1):
+            rtf = self.tiers[i].rtf
+            if rtf is None or rtf * duration <= LATENCY_BUDGET_SECONDS:
+                return i
+        return 0
+
+    def is_confident(self, result):
+        return result["avg_logprob"] >= MIN_AVG_LOGPROB and result["no_speech_prob"] <= MAX_NO_SPEECH_PROB
+
+    def transcribe(self, audio):
+        """Transcribes float32 mono 16 kHz audio; returns the result dict."""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        duration = len(audio) / SAMPLE_RATE
+        index = self.pick_tier(duration)
+        result = self.tiers[index].transcribe(audio)
+
+        # Silence is a confident empty result, not a reason to re-decode
+        while result["text"] and not self.is_confident(result) and index < len(self.tiers) - 1:
+            index += 1
+            self.redecodes += 1
+            logger.debug(f"Low confidence from {result['tier']} "
+                         f"(logprob {result['avg_logprob']:.2f}), re-decoding with {self.tiers[index].name}")
+            result = self.tiers[index].transcribe(audio)
+
+        logger.debug(f"STT {result['tier']} {duration:.1f}s audio in {result['seconds'] * 1000:.0f} ms")
+        return result
+
+    def stats(self):
+        return {
+            "tiers": {t.name: {"calls": t.calls, "rtf": t.rtf} for t in self.tiers},
+            "redecodes": self.redecodes,
+        }
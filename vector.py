@@ -4,6 +4,7 @@ from langchain_ollama import OllamaEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
 from langchain_community.document_loaders import PyPDFLoader
+from embedding_index import chroma_hnsw_metadata
 
 # Debug
 print("Working directory:", os.getcwd())
@@ -49,9 +50,11 @@ all_documents = client_documents + faq_documents
 embedding_model = OllamaEmbeddings(model="mxbai-embed-large")
 
 #  Build Chroma DB ---
+# HNSW M/ef are fixed when the collection is created (CANVI_HNSW_* to tune)
 vectorstore = Chroma.from_documents(
     all_documents,
     embedding_model,
-    persist_directory=db_path
+    persist_directory=db_path,
+    collection_metadata=chroma_hnsw_metadata()
 )
 vectorstore.persist()